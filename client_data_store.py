@@ -7,52 +7,63 @@ import pandas as pd
 import io
 import traceback
 
-# Get GitHub token from environment variable
-GITHUB_TOKEN = os.getenv('GITHUB_TOKEN')
-
-# Validate GitHub token
-if not GITHUB_TOKEN:
-    st.error("GitHub token not found. Please set the GITHUB_TOKEN environment variable.")
-    st.stop()
+from data_storage import STORAGE_BACKEND, StorageConflict, get_storage_backend
 
 # Name and folder settings
 name = "Your_Company"
 folder = name
 
-# GitHub login with your personal token
-try:
-    g = Github(GITHUB_TOKEN)
-    user = g.get_user()
-    # Test the token by making a simple API call
-    user.get_repos()
-    st.success("GitHub token is valid and working!")
-except Exception as e:
-    st.error(f"GitHub token validation failed: {str(e)}")
-    st.stop()
+# Upload numbers tried when the next file name is already taken
+MAX_NAME_ATTEMPTS = 20
 
-# Repository name
-repo_name = "client-dashboards-data"
+if STORAGE_BACKEND == 'github':
+    # Get GitHub token from environment variable
+    GITHUB_TOKEN = os.getenv('GITHUB_TOKEN')
 
-# Check if repository exists, if not create it
-try:
-    repo = user.get_repo(repo_name)
-    st.success(f"Found existing repository: {repo_name}")
-except Exception:
-    if st.button("Create Repository"):
-        try:
-            repo = user.create_repo(
-                repo_name,
-                description="Client dashboards data repository",
-                private=True
-            )
-            st.success(f"Created new repository: {repo_name}")
-        except Exception as e:
-            st.error(f"Failed to create repository: {str(e)}")
-            st.stop()
-    else:
-        st.error(f"Repository '{repo_name}' not found. Click the button above to create it.")
+    # Validate GitHub token
+    if not GITHUB_TOKEN:
+        st.error("GitHub token not found. Please set the GITHUB_TOKEN environment variable.")
+        st.stop()
+
+    # GitHub login with your personal token
+    try:
+        g = Github(GITHUB_TOKEN)
+        user = g.get_user()
+        # Test the token by making a simple API call
+        user.get_repos()
+        st.success("GitHub token is valid and working!")
+    except Exception as e:
+        st.error(f"GitHub token validation failed: {str(e)}")
         st.stop()
 
+    # Repository name
+    repo_name = "client-dashboards-data"
+
+    # Check if repository exists, if not create it
+    try:
+        repo = user.get_repo(repo_name)
+        st.success(f"Found existing repository: {repo_name}")
+    except Exception:
+        if st.button("Create Repository"):
+            try:
+                repo = user.create_repo(
+                    repo_name,
+                    description="Client dashboards data repository",
+                    private=True
+                )
+                st.success(f"Created new repository: {repo_name}")
+            except Exception as e:
+                st.error(f"Failed to create repository: {str(e)}")
+                st.stop()
+        else:
+            st.error(f"Repository '{repo_name}' not found. Click the button above to create it.")
+            st.stop()
+
+    # Uploads go to the validated repository through the storage backend
+    storage = get_storage_backend(token=GITHUB_TOKEN, repo=repo.full_name)
+else:
+    storage = get_storage_backend()
+
 st.title(f"📤 {name} Upload Portal")
 
 # Allow multiple file formats
@@ -95,8 +106,7 @@ if uploaded_file and st.button("Upload to Dashboard"):
         
         # Get list of existing files to determine the next number
         try:
-            contents = repo.get_contents(f"data/{folder}")
-            existing_files = [file.name for file in contents if file.type == "file" and file.name.endswith('.csv')]
+            existing_files = [file['name'] for file in storage.list(folder) if file['name'].endswith('.csv')]
             
             # Extract numbers from existing files
             numbers = []
@@ -115,56 +125,47 @@ if uploaded_file and st.button("Upload to Dashboard"):
         
         # Create new filename
         new_filename = f"{name} no {next_number} ({current_date}).csv"
-        upload_path = f"data/{folder}/{new_filename}"
         
         try:
-            # First try to create the data directory if it doesn't exist
-            try:
-                repo.get_contents("data")
-            except Exception:
-                repo.create_file(
-                    path="data/.gitkeep",
-                    message="Create data directory",
-                    content=""
-                )
-            
-            # Create the client folder if it doesn't exist
-            try:
-                repo.get_contents(f"data/{folder}")
-            except Exception:
-                repo.create_file(
-                    path=f"data/{folder}/.gitkeep",
-                    message=f"Create {folder} directory",
-                    content=""
-                )
-            
+            # Writing the file creates the client folder if it doesn't exist
             # Create progress bar
             progress_text = "Uploading data..."
             progress_bar = st.progress(0)
             
             # Create the new file with detailed error handling
             try:
-                repo.create_file(
-                    path=upload_path,
-                    message=f"New data upload on {datetime.now()} - {len(df)} rows",
-                    content=content
-                )
+                # Existing uploads are never replaced: if the name is taken
+                # (the listing above may have failed), use the next number
+                for attempt in range(MAX_NAME_ATTEMPTS):
+                    try:
+                        storage.write(
+                            folder,
+                            new_filename,
+                            content,
+                            message=f"New data upload on {datetime.now()} - {len(df)} rows"
+                        )
+                        break
+                    except StorageConflict:
+                        if attempt == MAX_NAME_ATTEMPTS - 1:
+                            raise
+                        next_number += 1
+                        new_filename = f"{name} no {next_number} ({current_date}).csv"
                 progress_bar.progress(1.0)
                 st.success(f"✅ File successfully uploaded with all {len(df)} rows as: {new_filename}")
             except Exception as e:
-                st.error(f"GitHub API Error: {str(e)}")
+                st.error(f"Storage Error: {str(e)}")
                 st.write("Detailed error information:")
                 st.code(traceback.format_exc())
                 st.stop()
             
             # Show list of all files in the directory
             try:
-                contents = repo.get_contents(f"data/{folder}")
+                contents = storage.list(folder)
                 if contents:
                     st.write("Previous uploads:")
                     for file in contents:
-                        if file.type == "file" and file.name.endswith('.csv'):
-                            st.write(f"- {file.name}")
+                        if file['name'].endswith('.csv'):
+                            st.write(f"- {file['name']}")
             except Exception:
                 pass
                 
@@ -0,0 +1,95 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Dated exchange rates: one row per (date, currency) with the amount of that
+# currency one unit of BASE_CURRENCY buys from that date on. Any currency
+# listed here can be selected in the dashboards.
+EXCHANGE_RATES_PATH = os.getenv(
+    'DASHBOARD_EXCHANGE_RATES', os.path.join('data', 'external', 'exchange_rates.csv')
+)
+
+# The currency the uploaded figures are recorded in
+BASE_CURRENCY = 'USD'
+
+CURRENCY_SYMBOLS = {
+    'USD': '$',
+    'BDT': '৳',
+    'EUR': '€',
+    'GBP': '£',
+    'INR': '₹',
+    'JPY': '¥',
+}
+
+
+def currency_symbol(currency):
+    return CURRENCY_SYMBOLS.get(currency, f'{currency} ')
+
+
+class ExchangeRates:
+    """A dated rate table, looked up with an as-of join.
+
+    A date uses the latest rate published on or before it; dates before a
+    currency's first rate use that first rate. Lookups are one binary search
+    over the rate dates for a whole array of dates.
+    """
+
+    def __init__(self, table):
+        self._rates = {}
+        table = table.sort_values(['currency', 'date'], kind='stable')
+        for currency, rows in table.groupby('currency', sort=False):
+            self._rates[currency] = (
+                rows['date'].to_numpy(dtype='datetime64[ns]'),
+                rows['rate'].to_numpy(dtype='float64'),
+            )
+        self.currencies = [BASE_CURRENCY] + sorted(set(self._rates) - {BASE_CURRENCY})
+
+    @classmethod
+    def from_csv(cls, path=EXCHANGE_RATES_PATH):
+        if not os.path.exists(path):
+            return cls(pd.DataFrame({'date': pd.to_datetime([]), 'currency': [], 'rate': []}))
+        table = pd.read_csv(path, dtype={'currency': 'string', 'rate': 'float64'})
+        table['date'] = pd.to_datetime(table['date'], format='%Y-%m-%d')
+        return cls(table)
+
+    def rates(self, currency, dates):
+        """Rates from BASE_CURRENCY to ``currency`` for an array of dates.
+
+        Returns None when no conversion is needed.
+        """
+        if currency == BASE_CURRENCY:
+            return None
+        if currency not in self._rates:
+            raise ValueError(f"No exchange rates for {currency}")
+        rate_dates, rates = self._rates[currency]
+        positions = np.searchsorted(rate_dates, np.asarray(dates, dtype='datetime64[ns]'), side='right') - 1
+        return rates[np.clip(positions, 0, len(rates) - 1)]
+
+    def convert(self, frame, currency, columns, date_column='date'):
+        """``frame`` with ``columns`` converted to ``currency`` as of each row's date.
+
+        Each column costs one array multiply. The frame is returned as it is
+        when ``currency`` is the base currency.
+        """
+        rates = self.rates(currency, frame[date_column].to_numpy())
+        if rates is None:
+            return frame
+        return frame.assign(**{
+            column: frame[column].to_numpy() * rates
+            for column in columns if column in frame.columns
+        })
+
+
+_shared_rates = None
+_shared_rates_lock = threading.Lock()
+
+
+def get_exchange_rates():
+    """The process-wide ExchangeRates, loaded from EXCHANGE_RATES_PATH once."""
+    global _shared_rates
+    with _shared_rates_lock:
+        if _shared_rates is None:
+            _shared_rates = ExchangeRates.from_csv()
+        return _shared_rates
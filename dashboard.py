@@ -2,11 +2,12 @@ import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 import plotly.express as px
-import base64
 import numpy as np
 import json
 import os
-from data_processor import DashboardDataProcessor
+from data_processor import create_processor
+from figure_cache import cached_figure
+from static_assets import static_asset_path, static_asset_url
 
 # Load text configuration from JSON file
 def load_text_config():
@@ -60,6 +61,14 @@ def load_text_config():
 # Load the text configuration
 TEXT_CONFIG = load_text_config()
 
+# 'full' renders every section on one page; 'lazy' shows the KPI row and
+# puts the other sections in tabs, computing only the one that is open
+LAYOUT_MODE = os.getenv("DASHBOARD_LAYOUT", "full")
+
+# Line charts with more points than this are drawn with WebGL (Scattergl)
+# traces, which stay smooth in the browser where SVG ones slow it down
+WEBGL_MIN_POINTS = int(os.getenv("DASHBOARD_WEBGL_POINTS", "1000"))
+
 def create_text_container(title, content, advice):
     return f"""
     <div style='background-color: #f0f2f6; padding: 15px; border-radius: 5px; margin-top: 10px;'>
@@ -74,7 +83,7 @@ def create_text_container(title, content, advice):
 # Set page configuration
 st.set_page_config(
     page_title="Mr. Life Okey Dashboard",
-    page_icon="images/logo.png",
+    page_icon=static_asset_path("images/logo.png", "icon"),
     layout="wide",
 )
 
@@ -92,15 +101,14 @@ st.markdown(hide_default_ui, unsafe_allow_html=True)
 # Custom Styling with Background
 ######################################
 def set_custom_style(background_image_path, sidebar_image_path):
-    with open(background_image_path, "rb") as image:
-        encoded = base64.b64encode(image.read()).decode()
-    with open(sidebar_image_path, "rb") as sidebar_img:
-        sidebar_encoded = base64.b64encode(sidebar_img.read()).decode()
+    # Images are served as static files, so the CSS carries only their URLs
+    background_url = static_asset_url(background_image_path, "background")
+    sidebar_url = static_asset_url(sidebar_image_path, "sidebar")
 
     css = f"""
     <style>
     .stApp {{
-        background-image: url("data:image/png;base64,{encoded}");
+        background-image: url("{background_url}");
         background-size: cover;
         background-position: center;
         background-repeat: no-repeat;
@@ -108,7 +116,7 @@ def set_custom_style(background_image_path, sidebar_image_path):
     }}
 
     [data-testid=stSidebar] {{
-        background-image: url("data:image/png;base64,{sidebar_encoded}");
+        background-image: url("{sidebar_url}");
         background-size: cover;
         background-position: center;
         background-repeat: no-repeat;
@@ -272,6 +280,10 @@ def show_metrics_chart(metrics_data, text_content=""):
     with st.container():
         st.markdown(text_content, unsafe_allow_html=True)
 
+def line_render_mode(data, y_columns):
+    """The px.line render mode for plotting ``y_columns`` of ``data``."""
+    return "webgl" if len(data) * len(y_columns) > WEBGL_MIN_POINTS else "svg"
+
 def get_dynamic_label(data_series, column_name, currency_symbol):
     max_value = data_series[column_name].max()
     if max_value >= 1000000:
@@ -289,20 +301,27 @@ def show_line_chart(sales_data, currency_symbol, text_content=""):
         'returns': returns_label
     }, inplace=True)
 
-    st.markdown('<h3 style="color: black;">Your Daily Business Performance</h3>', unsafe_allow_html=True)
-    st.markdown('<p style="color: #666; font-size: 0.9rem;">This chart shows your daily earnings and returns. Hover over the lines to see exact amounts.</p>', unsafe_allow_html=True)
+    # Long ranges come back as weekly or monthly totals
+    period = {'day': 'Daily', 'week': 'Weekly', 'month': 'Monthly'}[sales_data.attrs.get('granularity', 'day')]
+
+    st.markdown(f'<h3 style="color: black;">Your {period} Business Performance</h3>', unsafe_allow_html=True)
+    st.markdown(f'<p style="color: #666; font-size: 0.9rem;">This chart shows your {period.lower()} earnings and returns. Hover over the lines to see exact amounts.</p>', unsafe_allow_html=True)
     with st.container():
-        fig = px.line(sales_data, x='date', y=[sales_label, returns_label],
-                      title='Your Daily Income and Returns',
-                      labels={
-                          'date': 'Date',
-                          'value': 'Amount'
-                      },
-                      template='plotly_white')
-        fig.update_layout(**plot_defaults())
-        fig.update_layout(dragmode=False)
+        def build_figure():
+            y_columns = [sales_label, returns_label]
+            fig = px.line(sales_data, x='date', y=y_columns,
+                          title=f'Your {period} Income and Returns',
+                          labels={
+                              'date': 'Date',
+                              'value': 'Amount'
+                          },
+                          template='plotly_white',
+                          render_mode=line_render_mode(sales_data, y_columns))
+            fig.update_layout(**plot_defaults())
+            fig.update_layout(dragmode=False)
+            return fig
         st.plotly_chart(
-            fig,
+            cached_figure(build_figure, sales_data, currency_symbol, plot_defaults()),
             use_container_width=True,
             config={
                 "displayModeBar": False,
@@ -319,20 +338,22 @@ def show_order_source_and_top_products(order_data, product_data, currency_symbol
     col1, col2 = st.columns(2)
 
     with col1:
-        fig1 = px.pie(order_data, values='sales', names='order_source',
-                      title='How Customers Buy From You',
-                      template='plotly_white',
-                      hole=0.3)
-        fig1.update_layout(**plot_defaults())
-        fig1.update_traces(
-            textfont={'color': 'black', 'size': 12},
-            textinfo='percent+label',
-            marker=dict(line=dict(color='black', width=1)),
-            hovertemplate='%{label}<br>Amount: %{value:,.0f} {currency_symbol}<br>Percentage: %{percent:.1%}<extra></extra>'
-        )
-        fig1.update_layout(dragmode=False)
+        def build_figure():
+            fig1 = px.pie(order_data, values='sales', names='order_source',
+                          title='How Customers Buy From You',
+                          template='plotly_white',
+                          hole=0.3)
+            fig1.update_layout(**plot_defaults())
+            fig1.update_traces(
+                textfont={'color': 'black', 'size': 12},
+                textinfo='percent+label',
+                marker=dict(line=dict(color='black', width=1)),
+                hovertemplate='%{label}<br>Amount: %{value:,.0f} {currency_symbol}<br>Percentage: %{percent:.1%}<extra></extra>'
+            )
+            fig1.update_layout(dragmode=False)
+            return fig1
         st.plotly_chart(
-            fig1,
+            cached_figure(build_figure, order_data, currency_symbol, plot_defaults()),
             use_container_width=True,
             config={
                 "displayModeBar": False,
@@ -343,22 +364,24 @@ def show_order_source_and_top_products(order_data, product_data, currency_symbol
 
     with col2:
         st.markdown('<h5 style="color: black;">Your Best Selling Products</h5>', unsafe_allow_html=True)
-        fig2 = px.bar(product_data, x="sales", y="product_id", orientation="h",
-                      title="Your Top 10 Money-Making Products",
-                      labels={
-                          "sales": f"Money Earned in {currency_symbol} ",
-                          "product_id": "Product Name"
-                      },
-                      template="plotly_white")
-        layout = plot_defaults()
-        layout["yaxis"].update({'categoryorder': 'total ascending'})
-        fig2.update_layout(**layout)
-        fig2.update_traces(
-            hovertemplate='Product: %{y}<br>Amount: %{x:,.0f} {currency_symbol}<extra></extra>'
-        )
-        fig2.update_layout(dragmode=False)
+        def build_figure():
+            fig2 = px.bar(product_data, x="sales", y="product_id", orientation="h",
+                          title="Your Top 10 Money-Making Products",
+                          labels={
+                              "sales": f"Money Earned in {currency_symbol} ",
+                              "product_id": "Product Name"
+                          },
+                          template="plotly_white")
+            layout = plot_defaults()
+            layout["yaxis"].update({'categoryorder': 'total ascending'})
+            fig2.update_layout(**layout)
+            fig2.update_traces(
+                hovertemplate='Product: %{y}<br>Amount: %{x:,.0f} {currency_symbol}<extra></extra>'
+            )
+            fig2.update_layout(dragmode=False)
+            return fig2
         st.plotly_chart(
-            fig2,
+            cached_figure(build_figure, product_data, currency_symbol, plot_defaults()),
             use_container_width=True,
             config={
                 "displayModeBar": False,
@@ -385,18 +408,20 @@ def show_customer_growth_and_avg_order_value(monthly_data, currency_symbol, text
     col1, col2 = st.columns(2)
 
     with col1:
-        fig1 = px.line(monthly_data, x='month', y='New Customers',
-                       title='New Customers Each Month',
-                       markers=True,
-                       template='plotly_white',
-                       labels={
-                           "month": "Month",
-                           "New Customers": "Number of New Customers"
-                       })
-        fig1.update_layout(**plot_defaults())
-        fig1.update_layout(dragmode=False)
+        def build_figure():
+            fig1 = px.line(monthly_data, x='month', y='New Customers',
+                           title='New Customers Each Month',
+                           markers=True,
+                           template='plotly_white',
+                           labels={
+                               "month": "Month",
+                               "New Customers": "Number of New Customers"
+                           })
+            fig1.update_layout(**plot_defaults())
+            fig1.update_layout(dragmode=False)
+            return fig1
         st.plotly_chart(
-            fig1,
+            cached_figure(build_figure, monthly_data, currency_symbol, plot_defaults()),
             use_container_width=True,
             config={
                 "displayModeBar": False,
@@ -406,18 +431,20 @@ def show_customer_growth_and_avg_order_value(monthly_data, currency_symbol, text
         )
 
     with col2:
-        fig2 = px.line(monthly_data, x='month', 
-                       y=avg_spending_label,
-                       title='How Much Each Customer Spends',
-                       markers=True,
-                       template='plotly_white',
-                       labels={
-                           "month": "Month"
-                       })
-        fig2.update_layout(**plot_defaults())
-        fig2.update_layout(dragmode=False)
+        def build_figure():
+            fig2 = px.line(monthly_data, x='month', 
+                           y=avg_spending_label,
+                           title='How Much Each Customer Spends',
+                           markers=True,
+                           template='plotly_white',
+                           labels={
+                               "month": "Month"
+                           })
+            fig2.update_layout(**plot_defaults())
+            fig2.update_layout(dragmode=False)
+            return fig2
         st.plotly_chart(
-            fig2,
+            cached_figure(build_figure, monthly_data, currency_symbol, plot_defaults()),
             use_container_width=True,
             config={
                 "displayModeBar": False,
@@ -434,26 +461,28 @@ def show_category_analysis(category_data, currency_symbol, text_content=""):
     st.markdown('<p style="color: #666; font-size: 0.9rem;">See which types of products make you the most money. Hover over the bars and pie slices to see exact amounts.</p>', unsafe_allow_html=True)
     col1, col2 = st.columns(2)
     with col1:
-        fig1 = px.bar(category_data, x='category', y='sales',
-                      title='Money Earned by Product Type',
-                      labels={
-                          'sales': f'Total Money Earned in {currency_symbol} (1M = 1,000,000)',
-                          'category': 'Product Type'
-                      },
-                      template='plotly_white')
-        layout = plot_defaults()
-        layout.update(bargap=0.3)
-        fig1.update_layout(**layout)
-        fig1.update_traces(
-            marker=dict(
-                color='rgba(0, 128, 255, 0.8)',
-                line=dict(color='rgba(0, 128, 255, 0.8)', width=0)
-            ),
-            hovertemplate='Product Type: %{x}<br>Amount: %{y:,.0f} {currency_symbol}<extra></extra>'
-        )
-        fig1.update_layout(dragmode=False)
+        def build_figure():
+            fig1 = px.bar(category_data, x='category', y='sales',
+                          title='Money Earned by Product Type',
+                          labels={
+                              'sales': f'Total Money Earned in {currency_symbol} (1M = 1,000,000)',
+                              'category': 'Product Type'
+                          },
+                          template='plotly_white')
+            layout = plot_defaults()
+            layout.update(bargap=0.3)
+            fig1.update_layout(**layout)
+            fig1.update_traces(
+                marker=dict(
+                    color='rgba(0, 128, 255, 0.8)',
+                    line=dict(color='rgba(0, 128, 255, 0.8)', width=0)
+                ),
+                hovertemplate='Product Type: %{x}<br>Amount: %{y:,.0f} {currency_symbol}<extra></extra>'
+            )
+            fig1.update_layout(dragmode=False)
+            return fig1
         st.plotly_chart(
-            fig1,
+            cached_figure(build_figure, category_data, currency_symbol, plot_defaults()),
             use_container_width=True,
             config={
                 "displayModeBar": False,
@@ -462,19 +491,21 @@ def show_category_analysis(category_data, currency_symbol, text_content=""):
             }
         )
     with col2:
-        fig2 = px.pie(category_data, values='sales', names='category',
-                      title='How Your Sales Are Split',
-                      template='plotly_white',
-                      hole=0.4)
-        fig2.update_layout(**plot_defaults())
-        fig2.update_traces(
-            textfont={'color': 'black', 'size': 12},
-            textinfo='percent+label',
-            hovertemplate='%{label}<br>Amount: %{value:,.0f} {currency_symbol}<br>Percentage: %{percent:.1%}<extra></extra>'
-        )
-        fig2.update_layout(dragmode=False)
+        def build_figure():
+            fig2 = px.pie(category_data, values='sales', names='category',
+                          title='How Your Sales Are Split',
+                          template='plotly_white',
+                          hole=0.4)
+            fig2.update_layout(**plot_defaults())
+            fig2.update_traces(
+                textfont={'color': 'black', 'size': 12},
+                textinfo='percent+label',
+                hovertemplate='%{label}<br>Amount: %{value:,.0f} {currency_symbol}<br>Percentage: %{percent:.1%}<extra></extra>'
+            )
+            fig2.update_layout(dragmode=False)
+            return fig2
         st.plotly_chart(
-            fig2,
+            cached_figure(build_figure, category_data, currency_symbol, plot_defaults()),
             use_container_width=True,
             config={
                 "displayModeBar": False,
@@ -491,24 +522,26 @@ def show_inventory_analysis(inventory_data, currency_symbol, text_content=""):
     st.markdown('<p style="color: #666; font-size: 0.9rem;">Keep track of what products you have in stock. Hover over the charts to see exact numbers.</p>', unsafe_allow_html=True)
     col1, col2 = st.columns(2)
     with col1:
-        fig1 = px.bar(inventory_data, x='category', y='inventory',
-                      title='How Many Items You Have in Stock',
-                      labels={
-                          'inventory': 'Number of Items',
-                          'category': 'Product Type'
-                      },
-                      template='plotly_white')
-        fig1.update_layout(**plot_defaults())
-        fig1.update_traces(
-            marker=dict(
-                color='rgba(0, 128, 255, 0.8)',
-                line=dict(color='rgba(0, 128, 255, 0.8)', width=0)
-            ),
-            hovertemplate='Product Type: %{x}<br>Items in Stock: %{y:,.0f}<extra></extra>'
-        )
-        fig1.update_layout(dragmode=False)
+        def build_figure():
+            fig1 = px.bar(inventory_data, x='category', y='inventory',
+                          title='How Many Items You Have in Stock',
+                          labels={
+                              'inventory': 'Number of Items',
+                              'category': 'Product Type'
+                          },
+                          template='plotly_white')
+            fig1.update_layout(**plot_defaults())
+            fig1.update_traces(
+                marker=dict(
+                    color='rgba(0, 128, 255, 0.8)',
+                    line=dict(color='rgba(0, 128, 255, 0.8)', width=0)
+                ),
+                hovertemplate='Product Type: %{x}<br>Items in Stock: %{y:,.0f}<extra></extra>'
+            )
+            fig1.update_layout(dragmode=False)
+            return fig1
         st.plotly_chart(
-            fig1,
+            cached_figure(build_figure, inventory_data, currency_symbol, plot_defaults()),
             use_container_width=True,
             config={
                 "displayModeBar": False,
@@ -517,24 +550,26 @@ def show_inventory_analysis(inventory_data, currency_symbol, text_content=""):
             }
         )
     with col2:
-        fig2 = px.scatter(inventory_data, x='sales', y='inventory',
-                          size='profit_margin', color='category',
-                          title='Sales vs Stock Levels',
-                          labels={
-                              'sales': f'Money Earned in {currency_symbol} (1M = 1,000,000)',
-                              'inventory': 'Items in Stock',
-                              'profit_margin': 'Profit %',
-                              'category': 'Product Type'
-                          },
-                          template='plotly_white')
-        fig2.update_layout(**plot_defaults())
-        fig2.update_traces(
-            marker=dict(line=dict(width=1, color='black')),
-            hovertemplate='Product Type: %{customdata[0]}<br>Money Earned: %{x:,.0f} {currency_symbol}<br>Items in Stock: %{y:,.0f}<br>Profit: %{marker.size:.1f}%<extra></extra>'
-        )
-        fig2.update_layout(dragmode=False)
+        def build_figure():
+            fig2 = px.scatter(inventory_data, x='sales', y='inventory',
+                              size='profit_margin', color='category',
+                              title='Sales vs Stock Levels',
+                              labels={
+                                  'sales': f'Money Earned in {currency_symbol} (1M = 1,000,000)',
+                                  'inventory': 'Items in Stock',
+                                  'profit_margin': 'Profit %',
+                                  'category': 'Product Type'
+                              },
+                              template='plotly_white')
+            fig2.update_layout(**plot_defaults())
+            fig2.update_traces(
+                marker=dict(line=dict(width=1, color='black')),
+                hovertemplate='Product Type: %{customdata[0]}<br>Money Earned: %{x:,.0f} {currency_symbol}<br>Items in Stock: %{y:,.0f}<br>Profit: %{marker.size:.1f}%<extra></extra>'
+            )
+            fig2.update_layout(dragmode=False)
+            return fig2
         st.plotly_chart(
-            fig2,
+            cached_figure(build_figure, inventory_data, currency_symbol, plot_defaults()),
             use_container_width=True,
             config={
                 "displayModeBar": False,
@@ -560,18 +595,20 @@ def show_profitability_analysis(profit_data, currency_symbol, text_content=""):
     st.markdown('<h3 style="color: black;">Your Profit Overview</h3>', unsafe_allow_html=True)
     st.markdown('<p style="color: #666; font-size: 0.9rem;">See how much money you make after costs. Hover over the bars to see exact amounts.</p>', unsafe_allow_html=True)
     
-    fig = px.bar(profit_data, x='category', 
-                 y=[sales_label, profit_label],
-                 title='Money Earned vs Actual Profit',
-                 labels={
-                     'category': 'Product Type',
-                     'value': 'Amount'
-                 },
-                 barmode='group', template='plotly_white')
-    fig.update_layout(**plot_defaults())
-    fig.update_layout(dragmode=False)
+    def build_figure():
+        fig = px.bar(profit_data, x='category', 
+                     y=[sales_label, profit_label],
+                     title='Money Earned vs Actual Profit',
+                     labels={
+                         'category': 'Product Type',
+                         'value': 'Amount'
+                     },
+                     barmode='group', template='plotly_white')
+        fig.update_layout(**plot_defaults())
+        fig.update_layout(dragmode=False)
+        return fig
     st.plotly_chart(
-        fig,
+        cached_figure(build_figure, profit_data, currency_symbol, plot_defaults()),
         use_container_width=True,
         config={
             "displayModeBar": False,
@@ -596,18 +633,22 @@ def show_customer_insights(customer_data, currency_symbol, text_content=""):
     st.markdown('<h3 style="color: black;">Understanding Your Customers</h3>', unsafe_allow_html=True)
     st.markdown('<p style="color: #666; font-size: 0.9rem;">Track how many customers you get and how much they spend.</p>', unsafe_allow_html=True)
     
-    fig = px.line(customer_data, x='month', 
-                  y=['New Customers', avg_order_label],
-                  title='Customer Growth and Spending',
-                  labels={
-                      'month': 'Month',
-                      'value': 'Amount'
-                  },
-                  template='plotly_white')
-    fig.update_layout(**plot_defaults())
-    fig.update_layout(dragmode=False)
+    def build_figure():
+        y_columns = ['New Customers', avg_order_label]
+        fig = px.line(customer_data, x='month', 
+                      y=y_columns,
+                      title='Customer Growth and Spending',
+                      labels={
+                          'month': 'Month',
+                          'value': 'Amount'
+                      },
+                      template='plotly_white',
+                      render_mode=line_render_mode(customer_data, y_columns))
+        fig.update_layout(**plot_defaults())
+        fig.update_layout(dragmode=False)
+        return fig
     st.plotly_chart(
-        fig,
+        cached_figure(build_figure, customer_data, currency_symbol, plot_defaults()),
         use_container_width=True,
         config={
             "displayModeBar": False,
@@ -619,20 +660,82 @@ def show_customer_insights(customer_data, currency_symbol, text_content=""):
     with st.container():
         st.markdown(text_content, unsafe_allow_html=True)
 
+######################################
+# Dashboard Sections
+######################################
+# Sections with options of their own are fragments: changing such an option
+# reruns only that section, without filtering again or touching other panels
+
+@st.fragment
+def show_kpi_section(processor, text_content=""):
+    # Period the growth figures compare against
+    comparison_options = {
+        "Previous 30 Days": "30d",
+        "Previous 7 Days": "7d",
+        "Previous 90 Days": "90d",
+        "Month to Date vs Last Month": "mtd",
+        "Year to Date vs Last Year": "yoy",
+    }
+    option_col, _ = st.columns([1, 3])
+    with option_col:
+        comparison = st.selectbox(
+            "Compare Growth With",
+            options=list(comparison_options),
+            key="comparison"
+        )
+    processor.set_comparison(comparison_options[comparison])
+    show_metrics_chart(processor.get_metrics_data(), text_content)
+
+@st.fragment
+def show_sales_trend_section(processor, text_content=""):
+    # Detail of the sales trend chart; simplified views keep its shape
+    # with at most a few hundred points
+    trend_options = {
+        "Automatic": ("auto", None),
+        "Every Day": ("day", None),
+        "Every Day (Simplified)": ("day", "lttb"),
+        "Weekly": ("week", None),
+        "Monthly": ("month", None),
+    }
+    option_col, _ = st.columns([1, 3])
+    with option_col:
+        trend_detail = st.selectbox(
+            "Sales Trend Detail",
+            options=list(trend_options),
+            key="trend_detail"
+        )
+    processor.set_trend_options(*trend_options[trend_detail])
+    show_line_chart(processor.get_sales_trend_data(), processor.currency_symbol, text_content)
+
+def show_sections_in_tabs(sections):
+    # Only the open tab's section runs. Opening another tab reruns the
+    # script, which reuses the filtered data and cached panel results, so
+    # sections seen before come back without being computed again
+    tabs = st.tabs([name for name, _ in sections], key="section_tab", on_change="rerun")
+    for tab, (_, show_section) in zip(tabs, sections):
+        with tab:
+            if tab.open:
+                show_section()
+
 ######################################
 # Main App
 ######################################
 def main():
-    # Initialize data processor
-    processor = DashboardDataProcessor()
+    # Each viewer session keeps its data processor, and with it the applied
+    # filters, between reruns; the loaded data is shared by all sessions
+    # (DASHBOARD_BACKEND picks the pandas or SQLite query backend)
+    if "processor" not in st.session_state:
+        st.session_state.processor = create_processor()
+    processor = st.session_state.processor
+    processor.sync_dataset()
     
     # Set custom style
     set_custom_style("images/background_image.avif", "images/sidebar2.jpg")
 
     with st.sidebar:
         st.markdown('<div class="sidebar-logo-container">', unsafe_allow_html=True)
-        logo_encoded = base64.b64encode(open("images/logo.png", "rb").read()).decode()
-        st.markdown(f'<img src="data:image/png;base64,{logo_encoded}" class="sidebar-logo"/>', unsafe_allow_html=True)
+        logo_url = static_asset_url("images/logo.png", "logo")
+        st.markdown(f'<img src="{logo_url}" class="sidebar-logo"/>', unsafe_allow_html=True)
         st.markdown('</div>', unsafe_allow_html=True)
         st.markdown("<hr>", unsafe_allow_html=True)
         st.markdown('<h2 style="color: black;">Filters</h2>', unsafe_allow_html=True)
@@ -640,14 +743,13 @@ def main():
         # Currency selector
         currency = st.selectbox(
             "Select Currency",
-            options=["USD", "BDT"],
-            index=1
+            options=processor.currencies,
+            index=processor.currencies.index("BDT") if "BDT" in processor.currencies else 0
         )
         processor.set_currency(currency)
         
         # Get date range from data
-        min_date = processor.df['date'].min()
-        max_date = processor.df['date'].max()
+        min_date, max_date = processor.date_bounds()
         
         # Quick date range selector
         date_range_option = st.selectbox(
@@ -687,28 +789,43 @@ def main():
             )
         
         # Get unique categories
-        categories = processor.df['category'].unique()
+        categories = processor.dimension_values('category')
         selected_categories = st.multiselect(
             "Select Categories",
             options=categories,
             default=categories
         )
 
+        order_sources = processor.dimension_values('order_source')
+        selected_order_sources = st.multiselect(
+            "Select Order Sources",
+            options=order_sources,
+            default=order_sources
+        )
+
+        # Products are many; leaving the selection empty shows all of them
+        selected_products = st.multiselect(
+            "Select Products",
+            options=processor.dimension_values('product_id'),
+            placeholder="All products"
+        )
+
+        # The loaded data is shared by all viewers; pick up new uploads on request
+        if st.button("Refresh Data"):
+            processor.refresh()
+            st.rerun()
+
     st.markdown('<h1 style="text-align: center; color: black;">Mr. Life Okey Clothing Brand Dashboard</h1>', unsafe_allow_html=True)
 
     # Apply filters to the data
-    processor.apply_filters(date_range=date_range, categories=selected_categories)
-
-    # Get all processed data
-    metrics_data = processor.get_metrics_data()
-    sales_data = processor.get_sales_trend_data()
-    order_data = processor.get_order_source_data()
-    product_data = processor.get_product_data()
-    category_data = processor.get_category_data()
-    inventory_data = processor.get_inventory_data()
-    monthly_data = processor.get_customer_growth_data()
-    profit_data = processor.get_profitability_data()
-    customer_data = processor.get_customer_insights_data()
+    processor.apply_filters(
+        date_range=date_range,
+        categories=selected_categories,
+        order_sources=selected_order_sources,
+        products=selected_products
+    )
+
+    currency_symbol = processor.currency_symbol
 
     # --- Decide whether to show text suggestions based on selected date range ---
     suggestion_period = "Last 3 Months(suggestions will be shown)"
@@ -717,32 +834,53 @@ def main():
 
     # Display all charts - Pass text content only if show_suggestions is True
     text_metrics = create_text_container(TEXT_CONFIG['metrics']['title'], TEXT_CONFIG['metrics']['content'], TEXT_CONFIG['metrics']['advice']) if show_suggestions else ""
-    show_metrics_chart(metrics_data, text_metrics)
-
-    text_order = create_text_container(TEXT_CONFIG['order_analysis']['title'], TEXT_CONFIG['order_analysis']['content'], TEXT_CONFIG['order_analysis']['advice']) if show_suggestions else ""
-    show_order_source_and_top_products(order_data, product_data, metrics_data['currency_symbol'], text_order)
-
-    text_inventory = create_text_container(TEXT_CONFIG['inventory']['title'], TEXT_CONFIG['inventory']['content'], TEXT_CONFIG['inventory']['advice']) if show_suggestions else ""
-    show_inventory_analysis(inventory_data, metrics_data['currency_symbol'], text_inventory)
-
-    text_category = create_text_container(TEXT_CONFIG['category']['title'], TEXT_CONFIG['category']['content'], TEXT_CONFIG['category']['advice']) if show_suggestions else ""
-    show_category_analysis(category_data, metrics_data['currency_symbol'], text_category)
-
-    text_profit = create_text_container(TEXT_CONFIG['profitability']['title'], TEXT_CONFIG['profitability']['content'], TEXT_CONFIG['profitability']['advice']) if show_suggestions else ""
-    show_profitability_analysis(profit_data, metrics_data['currency_symbol'], text_profit)
-
-    text_sales = create_text_container(TEXT_CONFIG['sales_trend']['title'], TEXT_CONFIG['sales_trend']['content'], TEXT_CONFIG['sales_trend']['advice']) if show_suggestions else ""
-    show_line_chart(sales_data, metrics_data['currency_symbol'], text_sales)
-
-    # Only show customer insights and growth graphs for periods longer than 14 days
-    if date_range_option not in ["Last 7 Days", "Last 14 Days"]:
-        text_customer_insights = create_text_container(TEXT_CONFIG['customer_insights']['title'], TEXT_CONFIG['customer_insights']['content'], TEXT_CONFIG['customer_insights']['advice']) if show_suggestions else ""
-        show_customer_insights(customer_data, metrics_data['currency_symbol'], text_customer_insights)
-
-        text_growth = create_text_container(TEXT_CONFIG['growth']['title'], TEXT_CONFIG['growth']['content'], TEXT_CONFIG['growth']['advice']) if show_suggestions else ""
-        show_customer_growth_and_avg_order_value(monthly_data, metrics_data['currency_symbol'], text_growth)
+    show_kpi_section(processor, text_metrics)
+
+    # The sections below the KPI row request their data only when shown
+    def show_order_section():
+        text_order = create_text_container(TEXT_CONFIG['order_analysis']['title'], TEXT_CONFIG['order_analysis']['content'], TEXT_CONFIG['order_analysis']['advice']) if show_suggestions else ""
+        show_order_source_and_top_products(processor.get_order_source_data(), processor.get_product_data(), currency_symbol, text_order)
+
+    def show_inventory_section():
+        text_inventory = create_text_container(TEXT_CONFIG['inventory']['title'], TEXT_CONFIG['inventory']['content'], TEXT_CONFIG['inventory']['advice']) if show_suggestions else ""
+        show_inventory_analysis(processor.get_inventory_data(), currency_symbol, text_inventory)
+
+    def show_category_section():
+        text_category = create_text_container(TEXT_CONFIG['category']['title'], TEXT_CONFIG['category']['content'], TEXT_CONFIG['category']['advice']) if show_suggestions else ""
+        show_category_analysis(processor.get_category_data(), currency_symbol, text_category)
+
+    def show_profit_section():
+        text_profit = create_text_container(TEXT_CONFIG['profitability']['title'], TEXT_CONFIG['profitability']['content'], TEXT_CONFIG['profitability']['advice']) if show_suggestions else ""
+        show_profitability_analysis(processor.get_profitability_data(), currency_symbol, text_profit)
+
+    def show_sales_section():
+        text_sales = create_text_container(TEXT_CONFIG['sales_trend']['title'], TEXT_CONFIG['sales_trend']['content'], TEXT_CONFIG['sales_trend']['advice']) if show_suggestions else ""
+        show_sales_trend_section(processor, text_sales)
+
+    def show_customer_section():
+        # Only show customer insights and growth graphs for periods longer than 14 days
+        if date_range_option not in ["Last 7 Days", "Last 14 Days"]:
+            text_customer_insights = create_text_container(TEXT_CONFIG['customer_insights']['title'], TEXT_CONFIG['customer_insights']['content'], TEXT_CONFIG['customer_insights']['advice']) if show_suggestions else ""
+            show_customer_insights(processor.get_customer_insights_data(), currency_symbol, text_customer_insights)
+
+            text_growth = create_text_container(TEXT_CONFIG['growth']['title'], TEXT_CONFIG['growth']['content'], TEXT_CONFIG['growth']['advice']) if show_suggestions else ""
+            show_customer_growth_and_avg_order_value(processor.get_customer_growth_data(), currency_symbol, text_growth)
+        else:
+            st.info("Customer insights and growth analysis are only available for periods longer than 14 days.")
+
+    sections = [
+        ("Orders & Products", show_order_section),
+        ("Inventory", show_inventory_section),
+        ("Categories", show_category_section),
+        ("Profitability", show_profit_section),
+        ("Sales Trend", show_sales_section),
+        ("Customers", show_customer_section),
+    ]
+    if LAYOUT_MODE == "lazy":
+        show_sections_in_tabs(sections)
     else:
-        st.info("Customer insights and growth analysis are only available for periods longer than 14 days.")
+        for _, show_section in sections:
+            show_section()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+
+# Dimensions of the aggregate cube. 'month' is carried along so monthly
+# panels roll up exactly as they group the raw rows.
+CUBE_KEYS = ['date', 'month', 'category', 'order_source', 'product_id']
+
+# Measures summed per cell
+CUBE_SUMS = ['sales', 'returns', 'new_customers', 'profit', 'inventory', 'profit_margin', 'avg_order_value']
+
+# Measures the dashboard averages; each also gets a '<name>_count' of the
+# non-null values behind its sum, so means stay exact after roll-up
+CUBE_MEANS = ['sales', 'inventory', 'profit_margin', 'avg_order_value']
+
+
+def build_cube(df):
+    """Aggregate raw rows into one row per (date, month, category, source, product).
+
+    The result is sorted by date, like the base frame, so date ranges can be
+    selected from it by binary search. Rows missing a key value keep a cell
+    of their own (sorted last), so every row counts towards the totals.
+    """
+    keys = [key for key in CUBE_KEYS if key in df.columns]
+    sums = [column for column in CUBE_SUMS if column in df.columns]
+    means = [column for column in CUBE_MEANS if column in df.columns]
+
+    grouped = df.groupby(keys, observed=True, sort=True, dropna=False)
+    cube = grouped[sums].sum()
+    for column in sums:
+        if pd.api.types.is_integer_dtype(cube[column].dtype):
+            cube[column] = cube[column].astype('int64')
+    counts = grouped[means].count()
+    for column in means:
+        cube[f'{column}_count'] = counts[column].astype('int64')
+    cube['rows'] = grouped.size().astype('int64')
+    return cube.reset_index()
+
+
+def merge_cubes(cube, new_cube):
+    """Fold the cube of newly appended rows into an existing cube.
+
+    Only cube rows are regrouped, so the cost follows the size of the cube
+    rather than the number of raw rows behind it.
+    """
+    if cube is None or len(cube) == 0:
+        return new_cube
+    if len(new_cube) == 0:
+        return cube
+    keys = [key for key in CUBE_KEYS if key in cube.columns]
+    measures = [column for column in cube.columns if column not in keys]
+    parts = [cube, new_cube]
+    for column in keys:
+        if isinstance(cube[column].dtype, pd.CategoricalDtype):
+            categories = sorted(set(cube[column].cat.categories) | set(new_cube[column].cat.categories))
+            parts = [part.assign(**{column: part[column].cat.set_categories(categories)}) for part in parts]
+    combined = pd.concat(parts, ignore_index=True)
+    return combined.groupby(keys, observed=True, sort=True, dropna=False)[measures].sum().reset_index()
+
+
+def rollup(cube, by, aggregations):
+    """Group cube rows by ``by`` and aggregate them like raw rows.
+
+    ``aggregations`` maps output columns to 'sum', 'mean' or 'first', in the
+    order the columns should appear, mirroring ``DataFrame.agg``. Like a
+    groupby of the raw rows, cells missing their ``by`` value are left out.
+    """
+    sums = [column for column, how in aggregations.items() if how == 'sum']
+    means = [column for column, how in aggregations.items() if how == 'mean']
+    firsts = [column for column, how in aggregations.items() if how == 'first']
+    needed = list(dict.fromkeys(sums + means + [f'{column}_count' for column in means]))
+
+    grouped = cube.groupby(by, observed=True)
+    totals = grouped[needed].sum() if needed else None
+    firsts_frame = grouped[firsts].first() if firsts else None
+
+    result = pd.DataFrame(index=(totals if totals is not None else firsts_frame).index)
+    for column, how in aggregations.items():
+        if how == 'sum':
+            result[column] = totals[column]
+        elif how == 'mean':
+            count = totals[f'{column}_count'].to_numpy()
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result[column] = totals[column].to_numpy() / np.where(count > 0, count, np.nan)
+        else:
+            result[column] = firsts_frame[column]
+    return result.reset_index()
+
+
+def cube_mismatches(df, cube):
+    """Measures whose cube total differs from the total over the raw rows.
+
+    An empty result means no row was lost or counted twice on the way
+    into the cube.
+    """
+    mismatches = {}
+    for column in [column for column in CUBE_SUMS if column in df.columns] + ['rows']:
+        raw = len(df) if column == 'rows' else df[column].sum()
+        if not np.isclose(raw, cube[column].sum()):
+            mismatches[column] = (raw, cube[column].sum())
+    return mismatches
+
+
+class DailyPrefixSums:
+    """Running totals of per-day measures over every calendar day they span.
+
+    Built from a frame with one row per date, so the total of any column
+    over any window of days is the difference of two prefix entries, in
+    constant time whatever the window's length.
+    """
+
+    def __init__(self, daily, columns):
+        dates = daily['date'].to_numpy(dtype='datetime64[D]')
+        self.first_day = dates[0] if len(dates) else None
+        self.last_day = pd.Timestamp(dates[-1]) if len(dates) else None
+        days = (dates - self.first_day).astype(np.int64) if len(dates) else np.array([], dtype=np.int64)
+        self.days = int(days[-1]) + 1 if len(days) else 0
+        self.prefix = {}
+        for column in columns:
+            values = daily[column].to_numpy()
+            dtype = np.int64 if np.issubdtype(values.dtype, np.integer) else np.float64
+            dense = np.zeros(self.days + 1, dtype=dtype)
+            dense[days + 1] = values
+            self.prefix[column] = np.cumsum(dense)
+
+    def _position(self, day, after=False):
+        offset = int((pd.Timestamp(day).to_datetime64().astype('datetime64[D]') - self.first_day).astype(np.int64))
+        return min(max(offset + after, 0), self.days)
+
+    def totals(self, start=None, end=None):
+        """Totals of every column over the days from ``start`` to ``end``, inclusive."""
+        if self.first_day is None:
+            return {column: prefix[0] for column, prefix in self.prefix.items()}
+        low = 0 if start is None else self._position(start)
+        high = self.days if end is None else self._position(end, after=True)
+        high = max(high, low)
+        return {column: prefix[high] - prefix[low] for column, prefix in self.prefix.items()}
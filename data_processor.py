@@ -1,153 +1,1062 @@
 import pandas as pd
 import numpy as np
-from github import Github
 import os
-import base64
-import io
-import requests
 from io import StringIO
-import streamlit as st
+import json
+import functools
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-token = st.secrets["DATA_TOKEN"]
-class DashboardDataProcessor:
-    def __init__(self, folder_name='Your_Company'):
-        folder_url = f'https://api.github.com/repos/AllOfTech-Org/client-dashboards-data/contents/data/{folder_name}'
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # snapshots are skipped without pyarrow
+    pa = None
+
+from currency import BASE_CURRENCY, currency_symbol, get_exchange_rates
+from data_cube import DailyPrefixSums, build_cube, cube_mismatches, merge_cubes, rollup
+from data_storage import StorageError, get_storage_backend
+from http_client import RateLimitExceeded, get_http_client
+from trend_sampling import TREND_GRANULARITIES, TREND_MAX_POINTS, shape_trend
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on simultaneous CSV reads per dashboard load
+MAX_FETCH_WORKERS = 8
+
+# Column types of the dashboard data, as produced by generate_data.py.
+# Low-cardinality text columns become categoricals, small counts are
+# downcast and ratios are stored in single precision; money stays float64 so
+# large sums keep their cents.
+DASHBOARD_SCHEMA = {
+    'sales': 'float64',
+    'returns': 'float64',
+    'return_rate': 'float32',
+    'new_customers': 'int16',
+    'avg_order_value': 'float64',
+    'order_source': 'category',
+    'category': 'category',
+    'product_id': 'category',
+    'inventory': 'int32',
+    'profit_margin': 'float32',
+    'profit': 'float64',
+    'month': 'category',
+}
+DATE_FORMAT = '%Y-%m-%d'
+CATEGORICAL_COLUMNS = [column for column, dtype in DASHBOARD_SCHEMA.items() if dtype == 'category']
+SCHEMA_VERSION = hashlib.sha1(json.dumps([DASHBOARD_SCHEMA, DATE_FORMAT]).encode()).hexdigest()[:8]
+
+# Amounts recorded in the base currency and converted for display
+MONEY_COLUMNS = ['sales', 'returns', 'avg_order_value', 'profit']
+
+# Panels grouped by the same key read their columns from one roll-up of it
+CATEGORY_AGGREGATIONS = {'sales': 'sum', 'inventory': 'mean', 'profit_margin': 'mean', 'profit': 'sum'}
+MONTH_AGGREGATIONS = {'new_customers': 'sum', 'sales': 'sum', 'avg_order_value': 'mean'}
+
+# Categorical columns the dashboards can filter on
+FILTER_COLUMNS = ['category', 'order_source', 'product_id']
+
+# Daily totals behind the KPI cards, kept as prefix sums
+KPI_COLUMNS = ['sales', 'returns', 'new_customers', 'sales_count', 'rows']
+
+# Growth figures compare a period ending on the latest date with an earlier
+# one: the N days before for 'Nd', the same days of the previous month for
+# 'mtd', and the same days of the previous year, from January 1, for 'yoy'
+COMPARISON_WINDOWS = ['7d', '30d', '90d', 'mtd', 'yoy']
+DEFAULT_COMPARISON = '30d'
+
+# Columns that identify a row when re-uploaded exports overlap. None compares
+# whole rows; a natural key such as ['date', 'order_source', 'product_id']
+# lets a corrected re-upload replace the earlier version of a row. Only a
+# later upload replaces rows: rows sharing a key within one upload are kept.
+DEDUP_KEY = None
+# Bumped when the dedup rule changes, so stored data deduplicated under an
+# older rule is rebuilt
+DEDUP_VERSION = 2
+
+# Seconds a loaded client frame is shared across sessions before reloading
+DATASET_TTL_SECONDS = 600
+
+# Seconds before a failed refresh is tried again; meanwhile the data
+# already loaded keeps being served
+REFRESH_RETRY_SECONDS = 60
+
+# Merged, typed frames stored as memory-mappable Arrow files
+SNAPSHOT_DIR = os.path.join('data', 'processed')
+
+# Panel results kept across sessions, least recently used evicted first
+RESULT_CACHE_SIZE = 256
+
+# View options each cached panel depends on besides the filters and the
+# currency; changing any other option leaves its cached result valid
+TREND_OPTIONS = ('trend_granularity', 'trend_downsample', 'trend_max_points')
+PANEL_OPTIONS = {
+    'get_metrics_data': ('comparison',),
+    'get_sales_trend_data': TREND_OPTIONS,
+    'compute_dashboard': ('comparison',) + TREND_OPTIONS,
+}
+
+# 'pandas' answers queries from in-memory frames, 'sqlite' from an indexed
+# SQLite file per client (see sql_backend.py)
+QUERY_BACKEND = os.getenv('DASHBOARD_BACKEND', 'pandas')
+
+
+def upload_sort_key(file_name):
+    """Order uploads by the number client_data_store.py puts in the name."""
+    try:
+        return (int(file_name.split("no ")[1].split(" (")[0]), file_name)
+    except (IndexError, ValueError):
+        return (float('inf'), file_name)
+
+
+def read_upload(content):
+    """Parse one uploaded CSV straight into the dashboard schema.
 
-        headers = {
-            'Authorization': f'token {token}',
-            'Accept': 'application/vnd.github.v3+json'
+    Integer columns are only downcast when every value fits, so an unusual
+    upload keeps pandas' own type instead of failing to load.
+    """
+    read_dtypes = {
+        column: dtype for column, dtype in DASHBOARD_SCHEMA.items()
+        if not dtype.startswith('int')
+    }
+    df = pd.read_csv(StringIO(content), dtype=read_dtypes)
+
+    if 'date' in df.columns:
+        df['date'] = pd.to_datetime(df['date'], format=DATE_FORMAT)
+    for column, dtype in DASHBOARD_SCHEMA.items():
+        if not dtype.startswith('int') or column not in df.columns:
+            continue
+        values = df[column]
+        limits = np.iinfo(dtype)
+        if values.notna().all() and values.between(limits.min, limits.max).all():
+            df[column] = values.astype(dtype)
+    return df
+
+
+def align_categories(frames):
+    """Give each categorical column the same sorted categories in every frame.
+
+    pandas only keeps a concatenated column categorical when all parts share
+    their categories; sorting them keeps month and name order natural.
+    """
+    for column in CATEGORICAL_COLUMNS:
+        parts = [frame[column] for frame in frames if column in frame.columns]
+        if not parts or not all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            continue
+        categories = sorted(set().union(*(part.cat.categories for part in parts)))
+        for frame in frames:
+            if column in frame.columns and list(frame[column].cat.categories) != categories:
+                frame[column] = frame[column].cat.set_categories(categories)
+    return frames
+
+
+def schema_memory_report(df):
+    """Memory of ``df`` as typed, next to what default inference would use.
+
+    The default layout is what ``pd.read_csv`` gives without a schema:
+    text as Python strings and every number as 64 bits.
+    """
+    defaults = {}
+    for column, dtype in df.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            defaults[column] = object
+        elif pd.api.types.is_integer_dtype(dtype):
+            defaults[column] = 'int64'
+        elif pd.api.types.is_float_dtype(dtype):
+            defaults[column] = 'float64'
+    typed_bytes = int(df.memory_usage(deep=True).sum())
+    default_bytes = int(df.astype(defaults).memory_usage(deep=True).sum())
+    return {
+        'rows': len(df),
+        'default_bytes': default_bytes,
+        'typed_bytes': typed_bytes,
+        'reduction': round(default_bytes / typed_bytes, 1) if typed_bytes else 0,
+    }
+
+
+def fetch_csv(file, storage):
+    return read_upload(storage.read(file))
+
+
+def csv_listing(file_list):
+    """The CSV entries of a folder listing, in upload order."""
+    return sorted(
+        (file for file in file_list if file['name'].endswith('.csv')),
+        key=lambda file: upload_sort_key(file['name'])
+    )
+
+
+def fetch_csv_files(csv_files, storage, max_workers=MAX_FETCH_WORKERS):
+    """Read and parse CSV files in parallel.
+
+    Frames are parsed as their downloads complete and returned in the order
+    of ``csv_files``, so the concatenated result does not depend on network
+    timing. A file that cannot be read raises StorageError rather than
+    leaving a silently partial dataset.
+    """
+    if not csv_files:
+        return [], []
+    storage.prefetch(csv_files)
+
+    frames = [None] * len(csv_files)
+    workers = max(1, min(max_workers, len(csv_files)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(fetch_csv, file, storage): position
+            for position, file in enumerate(csv_files)
         }
+        for future in as_completed(futures):
+            frames[futures[future]] = future.result()
+    return list(csv_files), frames
+
+
+def file_manifest(files):
+    """(name, sha) pairs identifying exactly which uploads a frame holds."""
+    return [[file['name'], file.get('sha')] for file in files]
+
+
+def manifest_version(manifest):
+    """A fingerprint of a manifest, stable across reloads and processes."""
+    return hashlib.sha1(json.dumps(manifest).encode()).hexdigest()[:16]
+
+
+def new_uploads(manifest, csv_files):
+    """Uploads in ``csv_files`` that ``manifest`` does not hold yet.
+
+    Returns None when an upload that is already loaded has changed or
+    disappeared, since appending cannot account for that.
+    """
+    current = dict(file_manifest(csv_files))
+    if any(current.get(name) != sha for name, sha in manifest):
+        return None
+    known = {name for name, _ in manifest}
+    return [file for file in csv_files if file['name'] not in known]
+
+
+def combine_uploads(frames):
+    """Concatenate parsed uploads without losing their column types."""
+    return pd.concat(align_categories(list(frames)), ignore_index=True)
+
+
+def row_hashes(df, key=None):
+    """One 64-bit hash per row of ``df`` over the ``key`` columns."""
+    columns = key or list(df.columns)
+    return pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+
+
+def upload_numbers(frames):
+    """The position of the upload each row of the combined ``frames`` comes from."""
+    return np.repeat(np.arange(len(frames)), [len(frame) for frame in frames])
+
+
+def deduplicate(df, uploads, key=None):
+    """Drop rows of ``df`` that a later upload repeats.
+
+    ``uploads`` numbers the upload of each row in upload order. Every row
+    from the latest upload holding a key is kept, so rows that share a key
+    within one upload are never collapsed. Returns the remaining rows,
+    their hashes and the number dropped.
+    """
+    hashes = row_hashes(df, key)
+    latest = pd.Series(uploads).groupby(hashes).transform('max').to_numpy()
+    superseded = uploads < latest
+    dropped = int(superseded.sum())
+    if dropped:
+        df = df[~superseded].reset_index(drop=True)
+        hashes = hashes[~superseded]
+    return df, hashes, dropped
+
+
+def sort_by_date(df, hashes=None):
+    """Stable-sort rows by date, keeping upload order within a day."""
+    if 'date' not in df.columns or df['date'].is_monotonic_increasing:
+        return df, hashes
+    order = np.argsort(df['date'].to_numpy(), kind='stable')
+    df = df.take(order).reset_index(drop=True)
+    return df, (hashes[order] if hashes is not None else None)
+
+
+def merge_by_date(base, base_hashes, new_rows, new_hashes):
+    """Merge date-sorted ``new_rows`` into the date-sorted ``base``.
+
+    Each new row goes after every base row of the same or an earlier date,
+    found by binary search, so the merge is a single gather rather than a
+    sort of the whole history. Uploads of newer data simply append.
+    """
+    combined = combine_uploads([base.copy(deep=False), new_rows])
+    hashes = np.concatenate([base_hashes, new_hashes])
+    if 'date' not in combined.columns or len(base) == 0 or len(new_rows) == 0:
+        return combined, hashes
+
+    base_dates = base['date'].to_numpy()
+    new_dates = new_rows['date'].to_numpy()
+    if new_dates[0] >= base_dates[-1]:
+        return combined, hashes
+
+    positions = np.searchsorted(base_dates, new_dates, side='right') + np.arange(len(new_rows))
+    is_new = np.zeros(len(combined), dtype=bool)
+    is_new[positions] = True
+    order = np.empty(len(combined), dtype=np.int64)
+    order[~is_new] = np.arange(len(base))
+    order[is_new] = len(base) + np.arange(len(new_rows))
+    return combined.take(order).reset_index(drop=True), hashes[order]
+
+
+def dimension_mask(frame, filters):
+    """Rows of ``frame`` whose values are selected in every filter.
+
+    ``filters`` maps categorical columns to the values to keep. Each filter
+    looks the column's integer codes up in a boolean table indexed by code,
+    and the filters are combined with AND, so no strings are compared per
+    row. Returns None when ``filters`` is empty.
+    """
+    mask = None
+    for column, values in filters.items():
+        categories = frame[column].cat.categories
+        # One extra, False entry for missing values, whose code is -1
+        selected_codes = np.zeros(len(categories) + 1, dtype=bool)
+        positions = categories.get_indexer(list(values))
+        selected_codes[positions[positions >= 0]] = True
+        column_mask = selected_codes[frame[column].cat.codes.to_numpy()]
+        mask = column_mask if mask is None else mask & column_mask
+    return mask
+
+
+def comparison_periods(latest, window):
+    """The current and previous (start, end) date periods of a comparison window."""
+    if window == 'mtd':
+        start = latest.replace(day=1)
+        return (start, latest), (start - pd.DateOffset(months=1), latest - pd.DateOffset(months=1))
+    if window == 'yoy':
+        start = latest.replace(month=1, day=1)
+        return (start, latest), (start - pd.DateOffset(years=1), latest - pd.DateOffset(years=1))
+    if window.endswith('d') and window[:-1].isdigit():
+        days = pd.Timedelta(days=int(window[:-1]))
+        return (latest - days, latest), (latest - 2 * days, latest - days - pd.Timedelta(days=1))
+    raise ValueError(f"Unknown comparison window: {window}")
+
+
+def date_range_slice(dates, start=None, end=None):
+    """The slice of sorted ``dates`` with start <= date <= end."""
+    lo = 0 if start is None else int(np.searchsorted(dates, np.datetime64(start), side='left'))
+    hi = len(dates) if end is None else int(np.searchsorted(dates, np.datetime64(end), side='right'))
+    return slice(lo, max(lo, hi))
+
+
+class ClientDataset:
+    """The merged uploads of one client folder and the manifest behind them.
+
+    A dataset is never modified once it is shared: appending uploads builds a
+    new instance with a new ``version``, so sessions still reading the old
+    one are unaffected. The version is a fingerprint of the manifest, so it
+    is stable across reloads and processes.
+
+    Rows a later upload repeats are dropped at ingest, keeping the latest
+    version; ``duplicates_dropped`` counts them. Rows are kept sorted by
+    date, so ``dates`` doubles as an index for binary-search range lookups.
+
+    ``cube`` holds the rows pre-aggregated per day, category, order source
+    and product (see data_cube.py). It is built on first use and extended,
+    not rebuilt, when uploads are appended.
+    """
+
+    def __init__(self, folder_name, df, manifest, duplicates_dropped=0, hashes=None, cube=None):
+        self.folder_name = folder_name
+        self.df = df
+        self.manifest = manifest
+        self.duplicates_dropped = duplicates_dropped
+        self.version = manifest_version(manifest)
+        self._hashes = hashes
+        self.dates = df['date'].to_numpy() if 'date' in df.columns else None
+        self._cube = cube
+        self._cube_lock = threading.Lock()
+
+    @classmethod
+    def from_uploads(cls, folder_name, files, frames, dedup_key=DEDUP_KEY):
+        df, hashes, dropped = deduplicate(combine_uploads(frames), upload_numbers(frames), dedup_key)
+        if dropped:
+            logger.info("%s: dropped %d duplicate rows", folder_name, dropped)
+        df, hashes = sort_by_date(df, hashes)
+        return cls(folder_name, df, file_manifest(files), dropped, hashes)
+
+    @property
+    def cube(self):
+        with self._cube_lock:
+            if self._cube is None:
+                self._cube = build_cube(self.df)
+                mismatches = cube_mismatches(self.df, self._cube)
+                if mismatches:
+                    logger.warning("%s: cube totals differ from the raw rows: %s", self.folder_name, mismatches)
+            return self._cube
+
+    @property
+    def cube_dates(self):
+        return self.cube['date'].to_numpy()
+
+    @property
+    def row_hashes(self):
+        # Not stored in snapshots; one vectorised pass rebuilds them
+        if self._hashes is None:
+            self._hashes = row_hashes(self.df, DEDUP_KEY)
+        return self._hashes
+
+    def new_files(self, csv_files):
+        """Uploads in ``csv_files`` that this dataset does not hold yet; see new_uploads."""
+        return new_uploads(self.manifest, csv_files)
+
+    def append(self, files, frames, dedup_key=DEDUP_KEY):
+        """A new dataset with the parsed ``frames`` of ``files`` added.
+
+        Only the new uploads are parsed and typed; the existing rows are
+        reused as they are, except for older versions of rows the new
+        uploads repeat, which are dropped.
+        """
+        new_rows, new_hashes, dropped = deduplicate(combine_uploads(frames), upload_numbers(frames), dedup_key)
+        new_rows, new_hashes = sort_by_date(new_rows, new_hashes)
+        base, base_hashes = self.df, self.row_hashes
+        cube = self._cube
+        replaced = np.isin(base_hashes, new_hashes)
+        if replaced.any():
+            dropped += int(replaced.sum())
+            base, base_hashes = base[~replaced], base_hashes[~replaced]
+            # Rows left the history, so the cube is rebuilt when next needed
+            cube = None
+        elif cube is not None:
+            cube = merge_cubes(cube, build_cube(new_rows))
+        if dropped:
+            logger.info("%s: dropped %d duplicate rows", self.folder_name, dropped)
+
+        df, hashes = merge_by_date(base, base_hashes, new_rows, new_hashes)
+        return ClientDataset(
+            self.folder_name, df, self.manifest + file_manifest(files),
+            self.duplicates_dropped + dropped, hashes, cube
+        )
+
+    def date_slice(self, start=None, end=None):
+        """Rows dated within [start, end], found by binary search."""
+        if self.dates is None:
+            return slice(0, len(self.df))
+        return date_range_slice(self.dates, start, end)
+
+    def memory_report(self):
+        return schema_memory_report(self.df)
+
+
+class DatasetSnapshot:
+    """Merged frame of a client folder stored as an uncompressed Arrow file.
+
+    Uncompressed Arrow IPC files can be memory-mapped, so a later start reads
+    the columns straight from the page cache instead of parsing CSV text
+    again, and all worker processes on the machine share the same pages.
+    A small JSON manifest records which uploads the snapshot was built from.
+    """
+
+    # Serialises writers within the process; files are swapped in atomically
+    _save_lock = threading.Lock()
+
+    def __init__(self, folder_name, snapshot_dir=SNAPSHOT_DIR):
+        self.folder_name = folder_name
+        self.snapshot_dir = snapshot_dir
 
-        response = requests.get(folder_url, headers=headers)
-        if response.status_code != 200:
-            raise Exception("Failed to fetch folder content")
+    @property
+    def manifest_path(self):
+        return os.path.join(self.snapshot_dir, f'{self.folder_name}.manifest.json')
 
-        file_list = response.json()
+    def read_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return None
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except ValueError:
+            return None
 
-        all_dataframes = []
+    def load(self):
+        """Memory-map the stored snapshot as a dataset, if there is one."""
+        stored = self.read_manifest()
+        if pa is None or not stored or stored.get('schema') != SCHEMA_VERSION:
+            return None
+        if stored.get('dedup_key') != DEDUP_KEY or stored.get('dedup_version') != DEDUP_VERSION:
+            return None
+        path = os.path.join(self.snapshot_dir, stored['snapshot'])
+        if not os.path.exists(path):
+            return None
+        table = feather.read_table(path, memory_map=True)
+        # split_blocks keeps numeric columns as zero-copy views of the map
+        df, _ = sort_by_date(table.to_pandas(split_blocks=True))
+        return ClientDataset(self.folder_name, df, stored['files'], stored.get('duplicates_dropped', 0))
 
-        for file in file_list:
-            if file['name'].endswith('.csv'):
-                file_url = file['download_url']
-                csv_response = requests.get(file_url, headers=headers)
-                if csv_response.status_code == 200:
-                    csv_content = StringIO(csv_response.text)
-                    df = pd.read_csv(csv_content)
-                    all_dataframes.append(df)
-                else:
-                    print(f"Failed to fetch: {file['name']}")
+    def save(self, dataset):
+        manifest = dataset.manifest
+        if pa is None or any(sha is None for _, sha in manifest):
+            return
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        file_name = f'{self.folder_name}-{dataset.version}.arrow'
+        path = os.path.join(self.snapshot_dir, file_name)
 
-        if not all_dataframes:
-            raise Exception("No CSV files found in the GitHub folder.")
+        with self._save_lock:
+            previous = self.read_manifest()
 
-        self.df = pd.concat(all_dataframes, ignore_index=True)
+            # New snapshots get a new name, so processes that still map the
+            # old file keep reading a complete one
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            feather.write_feather(dataset.df, tmp_path, compression='uncompressed')
+            os.replace(tmp_path, path)
+            tmp_manifest = f'{self.manifest_path}.{os.getpid()}.tmp'
+            with open(tmp_manifest, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'snapshot': file_name,
+                    'schema': SCHEMA_VERSION,
+                    'dedup_key': DEDUP_KEY,
+                    'dedup_version': DEDUP_VERSION,
+                    'duplicates_dropped': dataset.duplicates_dropped,
+                    'files': manifest,
+                }, f)
+            os.replace(tmp_manifest, self.manifest_path)
 
-        # Convert 'date' column to datetime if it exists
-        self.df['date'] = pd.to_datetime(self.df.get('date', pd.Series([], dtype='datetime64[ns]')))
-        self.currency = 'USD'
-        self.currency_symbol = '$'
-        self.exchange_rates = {'USD': 1.0, 'BDT': 110.0}
-        self.filtered_df = self.df.copy()
+            if previous and previous.get('snapshot') != file_name:
+                try:
+                    os.remove(os.path.join(self.snapshot_dir, previous['snapshot']))
+                except OSError:
+                    pass
 
+    def save_in_background(self, dataset):
+        # Rewriting the snapshot is proportional to the whole history, so it
+        # must not hold up an incremental refresh
+        threading.Thread(target=self.save, args=(dataset,), daemon=True).start()
 
 
+def refresh_dataset(dataset, csv_files=None, storage=None):
+    """Bring ``dataset`` up to date by parsing only uploads it does not hold.
+
+    Returns the same dataset when nothing was added, and None when history
+    has changed and the folder has to be loaded again from scratch.
+    """
+    storage = storage or get_storage_backend()
+    if csv_files is None:
+        csv_files = csv_listing(storage.list(dataset.folder_name))
+
+    new_files = dataset.new_files(csv_files)
+    if new_files is None:
+        return None
+    if not new_files:
+        return dataset
+
+    loaded_files, frames = fetch_csv_files(new_files, storage)
+    if not frames:
+        return dataset
+    dataset = dataset.append(loaded_files, frames)
+    DatasetSnapshot(dataset.folder_name).save_in_background(dataset)
+    return dataset
+
+
+def load_dataset(folder_name, storage=None):
+    """Read and merge every upload of a client folder into one dataset."""
+    storage = storage or get_storage_backend()
+    csv_files = csv_listing(storage.list(folder_name))
+
+    # Start from the snapshot when it covers a prefix of the current uploads
+    snapshot = DatasetSnapshot(folder_name)
+    dataset = snapshot.load()
+    if dataset is not None:
+        dataset = refresh_dataset(dataset, csv_files, storage)
+        if dataset is not None:
+            return dataset
+
+    loaded_files, all_dataframes = fetch_csv_files(csv_files, storage)
+
+    if not all_dataframes:
+        raise Exception(f"No CSV files found in the {folder_name} folder.")
+
+    dataset = ClientDataset.from_uploads(folder_name, loaded_files, all_dataframes)
+    snapshot.save(dataset)
+    return dataset
+
+
+class DatasetRegistry:
+    """Process-wide store of loaded client datasets, shared by every session.
+
+    Streamlit reruns the dashboard script for each interaction of each
+    viewer, but imported modules live for the whole server process, so one
+    registry instance serves all of them. Frames handed out are shared and
+    must be treated as read-only. Once the TTL expires a dataset is brought
+    up to date incrementally rather than reloaded.
+    """
+
+    def __init__(self, ttl=DATASET_TTL_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._load_locks = {}
+
+    def _entry(self, folder_name):
+        entry = self._entries.get(folder_name)
+        if entry is None:
+            return None, False
+        loaded_at, dataset = entry
+        return dataset, time.monotonic() - loaded_at < self.ttl
+
+    def get(self, folder_name):
+        with self._lock:
+            dataset, fresh = self._entry(folder_name)
+            if fresh:
+                return dataset
+        return self.refresh(folder_name, force=False)
+
+    def refresh(self, folder_name, force=True):
+        """Pick up new uploads for a folder, loading it if it is not held.
+
+        When a held folder cannot be refreshed, the held dataset is kept and
+        the refresh is tried again after REFRESH_RETRY_SECONDS.
+        """
+        with self._lock:
+            load_lock = self._load_locks.setdefault(folder_name, threading.Lock())
+
+        # Only one session loads a given folder; the others wait for it
+        with load_lock:
+            with self._lock:
+                dataset, fresh = self._entry(folder_name)
+            if fresh and not force:
+                return dataset
+            loaded_at = time.monotonic()
+            try:
+                dataset = self.load(folder_name, dataset)
+            except (StorageError, RateLimitExceeded, OSError, sqlite3.Error) as e:
+                # Network and request errors are OSErrors too; SQLite errors
+                # come from uploads the SQLite store cannot take
+                if dataset is None:
+                    raise
+                logger.warning("%s: refresh failed, serving the loaded data: %s", folder_name, e)
+                loaded_at += REFRESH_RETRY_SECONDS - self.ttl
+            with self._lock:
+                self._entries[folder_name] = (loaded_at, dataset)
+            return dataset
+
+    def load(self, folder_name, current=None):
+        """``current`` brought up to date, or the folder loaded from scratch."""
+        dataset = refresh_dataset(current) if current is not None else None
+        return dataset if dataset is not None else load_dataset(folder_name)
+
+    def invalidate(self, folder_name=None):
+        with self._lock:
+            if folder_name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(folder_name, None)
+
+
+dataset_registry = DatasetRegistry()
+
+
+def copy_result(result):
+    """A copy of a panel result that callers may modify freely."""
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        return result.copy()
+    if isinstance(result, dict):
+        return {key: copy_result(value) for key, value in result.items()}
+    return result
+
+
+class ResultCache:
+    """Bounded LRU cache of panel results, shared by every session.
+
+    Keys carry the dataset version, so a refreshed dataset never serves
+    stale results; entries for old versions simply age out. Results are
+    copied on the way in and out, since callers may modify them.
+    """
+
+    def __init__(self, max_size=RESULT_CACHE_SIZE):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, size=len(self._entries))
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return copy_result(self._entries[key])
+            self._stats['misses'] += 1
+
+        # Computed outside the lock; concurrent misses for one key may both
+        # compute it, which costs time but never correctness
+        result = compute()
+        with self._lock:
+            self._entries[key] = copy_result(result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+result_cache = ResultCache()
+
+
+def cached_result(method):
+    """Serve a panel method from the result cache for the current filter state.
+
+    Calls passing precomputed inputs bypass the cache.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if args or kwargs:
+            return method(self, *args, **kwargs)
+        return self.result_cache.get_or_compute(
+            self.panel_key(method.__name__), lambda: method(self)
+        )
+    return wrapper
+
+
+class DashboardDataProcessor:
+    def __init__(self, folder_name='Your_Company'):
+        self.folder_name = folder_name
+        self._open()
+        self.result_cache = result_cache
+        self.exchange_rates = get_exchange_rates()
+        self.currencies = self.exchange_rates.currencies
+        self.currency = None
+        self.set_currency(BASE_CURRENCY)
+        self.comparison = DEFAULT_COMPARISON
+        self.set_trend_options()
+        self._applied_filters = None
+        self.apply_filters()
+
+    def _open(self, refresh=False):
+        # Shared across sessions; per-session state is the currency and filters
+        self.dataset = (dataset_registry.refresh if refresh else dataset_registry.get)(self.folder_name)
+        self.df = self.dataset.df
+
+    def refresh(self):
+        """Pick up uploads added since the shared dataset was loaded."""
+        self._open(refresh=True)
+        self.apply_filters(self.date_range, self.categories, self.order_sources, self.products)
+
+    def sync_dataset(self):
+        """Follow the shared dataset if it was reloaded, e.g. once its TTL ran out.
+
+        For processors kept across reruns; the next ``apply_filters`` call
+        selects from the new version.
+        """
+        self._open()
+
+    @property
+    def data_version(self):
+        return self.dataset.version
+
     def set_currency(self, currency):
+        if currency not in self.currencies:
+            raise ValueError(f"No exchange rates for {currency}")
+        if currency == self.currency:
+            return
         self.currency = currency
-        self.currency_symbol = {'USD': '$', 'BDT': '৳'}.get(currency, '$')
+        self.currency_symbol = currency_symbol(currency)
+        self._reset_derived()
+
+    def _reset_derived(self):
+        # Data derived from the filtered rows in the selected currency
+        self._converted_cube = None
+        self._kpi_totals = None
+        self._rollups = {}
+
+    def set_comparison(self, window):
+        if window not in COMPARISON_WINDOWS:
+            raise ValueError(f"Unknown comparison window: {window}")
+        self.comparison = window
+
+    def set_trend_options(self, granularity='auto', downsample=None, max_points=TREND_MAX_POINTS):
+        """How the sales trend is shaped; see trend_sampling.shape_trend."""
+        if granularity not in TREND_GRANULARITIES:
+            raise ValueError(f"Unknown trend granularity: {granularity}")
+        if downsample not in (None, 'lttb'):
+            raise ValueError(f"Unknown downsampling mode: {downsample}")
+        self.trend_granularity = granularity
+        self.trend_downsample = downsample
+        self.trend_max_points = max_points
+
+    def dimension_values(self, column):
+        """The values a dimension filter on ``column`` can select."""
+        cube = self.dataset.cube
+        return list(cube[column].cat.categories) if column in cube.columns else []
+
+    def date_bounds(self):
+        """The first and last date in the data."""
+        dates = self.dataset.cube_dates
+        # Rows without a date sort last in the cube
+        dates = dates[~pd.isna(dates)]
+        if not len(dates):
+            return pd.NaT, pd.NaT
+        return pd.Timestamp(dates[0]), pd.Timestamp(dates[-1])
+
+    def _dimension_filters(self, categories, order_sources, products):
+        """The effective dimension filters, as sorted tuples of values by column.
+
+        Selections covering every value are dropped, so equivalent filter
+        states select the same rows and share cached results.
+        """
+        filters = {}
+        for column, values in zip(FILTER_COLUMNS, (categories, order_sources, products)):
+            if values is None or len(values) == 0:
+                continue
+            values = set(values)
+            if not values.issuperset(self.dimension_values(column)):
+                filters[column] = tuple(sorted(values))
+        return filters
+
+    def apply_filters(self, date_range=None, categories=None, order_sources=None, products=None):
+        """Select the part of the shared data that matches the filters.
+
+        Empty or missing selections do not filter. The ``get_*`` methods
+        answer from ``filtered_cube``, the matching rows of the dataset's
+        aggregate cube, which is far smaller than the raw data. Raw rows
+        are only selected when ``filtered_df`` is read.
+
+        Applying the filters already in effect to the same dataset version
+        does nothing, so the selected rows and everything derived from them
+        survive reruns that only change the currency or view options.
+        """
+        dimension_filters = self._dimension_filters(categories, order_sources, products)
+        applied = (
+            self.data_version,
+            None if date_range is None else tuple(date_range),
+            tuple(sorted(dimension_filters.items())),
+        )
+        if applied == self._applied_filters:
+            return
+        self._applied_filters = applied
+
+        self.date_range = date_range
+        self.categories = categories
+        self.order_sources = order_sources
+        self.products = products
+        self.dimension_filters = dimension_filters
+        self._select_filtered()
+        self._reset_derived()
+
+    def _select_filtered(self):
+        cube = self.dataset.cube
+        cube_rows = self._date_rows(cube, self.dataset.cube_dates)
+        self.filtered_cube = self._select(cube, self.dataset.cube_dates, cube_rows)
+        self._filtered_df = None
+        self._filter_key = (cube_rows.start, cube_rows.stop, tuple(sorted(self.dimension_filters.items())))
+
+    @property
+    def result_key(self):
+        """Identifies the current dataset version, filters and currency."""
+        return (self.folder_name, self.dataset.version) + self._filter_key + (self.currency,)
+
+    def panel_key(self, panel):
+        """The result cache key of ``panel``: ``result_key`` and the view options it uses."""
+        options = tuple(getattr(self, option) for option in PANEL_OPTIONS.get(panel, ()))
+        return self.result_key + (panel,) + options
+
+    @property
+    def converted_cube(self):
+        """``filtered_cube`` with amounts in the selected currency.
+
+        Each cube row is converted at the rate of its date before rolling
+        up, so totals spanning rate changes are exact.
+        """
+        if self._converted_cube is None:
+            self._converted_cube = self.exchange_rates.convert(
+                self.filtered_cube, self.currency, MONEY_COLUMNS
+            )
+        return self._converted_cube
+
+    @property
+    def kpi_totals(self):
+        """Prefix sums of the filtered daily KPI totals.
+
+        Returns a (display currency, base currency) pair. Daily totals are
+        converted at each day's rate before summing.
+        """
+        if self._kpi_totals is None:
+            daily = rollup(self.filtered_cube, 'date', {column: 'sum' for column in KPI_COLUMNS})
+            converted = self.exchange_rates.convert(daily, self.currency, MONEY_COLUMNS)
+            self._kpi_totals = (DailyPrefixSums(converted, KPI_COLUMNS), DailyPrefixSums(daily, KPI_COLUMNS))
+        return self._kpi_totals
+
+    @property
+    def filtered_df(self):
+        if self._filtered_df is None:
+            self._filtered_df = self._select(self.df, self.dataset.dates)
+        return self._filtered_df
 
-    def convert_amount(self, amount):
-        return amount * self.exchange_rates.get(self.currency, 1)
+    def _date_rows(self, frame, dates):
+        """The contiguous rows of a date-sorted ``frame`` in the date range."""
+        if self.date_range and dates is not None:
+            start, end = pd.to_datetime(self.date_range[0]), pd.to_datetime(self.date_range[1])
+            return date_range_slice(dates, start, end)
+        return slice(0, len(frame))
 
-    def apply_filters(self, date_range=None, categories=None):
-        self.filtered_df = self.df.copy()
-        if date_range:
-            start, end = pd.to_datetime(date_range[0]), pd.to_datetime(date_range[1])
-            self.filtered_df = self.filtered_df[(self.filtered_df['date'] >= start) & (self.filtered_df['date'] <= end)]
-        if categories and 'category' in self.filtered_df.columns:
-            self.filtered_df = self.filtered_df[self.filtered_df['category'].isin(categories)]
+    def _select(self, frame, dates, rows=None):
+        """Rows of a date-sorted ``frame`` matching the current filters.
 
+        The date range is a contiguous slice found by binary search; the
+        dimension filters are only evaluated on that slice. With no effective
+        filter the frame itself is returned rather than a copy of it.
+        """
+        rows = self._date_rows(frame, dates) if rows is None else rows
+        selected = frame if rows == slice(0, len(frame)) else frame.iloc[rows]
+
+        mask = dimension_mask(selected, self.dimension_filters)
+        if mask is not None and not mask.all():
+            selected = selected[mask]
+        return selected
+
+    @cached_result
     def get_metrics_data(self):
-        latest_date = self.filtered_df['date'].max()
-        total_sales = self.convert_amount(self.filtered_df['sales'].sum())
-        avg_daily_sales = self.convert_amount(self.filtered_df['sales'].mean())
-        total_customers = self.filtered_df['new_customers'].sum()
-        return_rate = (self.filtered_df['returns'].sum() / self.filtered_df['sales'].sum()) * 100 if self.filtered_df['sales'].sum() > 0 else 0
+        totals, base_totals = self.kpi_totals
+        overall, base_overall = totals.totals(), base_totals.totals()
+
+        def mean(totals, column):
+            count = totals[f'{column}_count']
+            return totals[column] / count if count else np.nan
 
-        current = self.filtered_df[self.filtered_df['date'] >= latest_date - pd.Timedelta(days=30)]
-        previous = self.filtered_df[(self.filtered_df['date'] >= latest_date - pd.Timedelta(days=60)) & (self.filtered_df['date'] < latest_date - pd.Timedelta(days=30))]
+        def return_rate(totals):
+            return (totals['returns'] / totals['sales']) * 100 if totals['sales'] > 0 else 0
 
         def safe_growth(curr, prev):
             return ((curr - prev) / prev) * 100 if prev else 0
 
-        current_return_rate = (current['returns'].sum() / current['sales'].sum()) * 100 if current['sales'].sum() > 0 else 0
-        previous_return_rate = (previous['returns'].sum() / previous['sales'].sum()) * 100 if previous['sales'].sum() > 0 else 0
-        return_rate_change = safe_growth(current_return_rate, previous_return_rate)
+        # Every window total is a difference of two prefix entries
+        if totals.last_day is not None:
+            current_period, previous_period = comparison_periods(totals.last_day, self.comparison)
+        else:
+            current_period = previous_period = (None, None)
+        current, previous = totals.totals(*current_period), totals.totals(*previous_period)
+
+        # Return rates compare amounts of the same rows, so they are taken in
+        # the base currency where exchange-rate moves cannot shift them
+        return_rate_change = safe_growth(
+            return_rate(base_totals.totals(*current_period)),
+            return_rate(base_totals.totals(*previous_period))
+        )
 
         return {
-            'total_sales': total_sales,
-            'avg_daily_sales': avg_daily_sales,
-            'total_customers': total_customers,
-            'return_rate': round(return_rate, 2),
+            'total_sales': overall['sales'],
+            'avg_daily_sales': mean(overall, 'sales'),
+            'total_customers': overall['new_customers'],
+            'return_rate': round(return_rate(base_overall), 2),
             'return_rate_change': round(return_rate_change, 2),
-            'sales_growth': round(safe_growth(current['sales'].sum(), previous['sales'].sum()), 1),
-            'daily_sales_growth': round(safe_growth(current['sales'].mean(), previous['sales'].mean()), 1),
-            'customer_growth': round(safe_growth(current['new_customers'].sum(), previous['new_customers'].sum()), 1),
+            'sales_growth': round(safe_growth(current['sales'], previous['sales']), 1),
+            'daily_sales_growth': round(safe_growth(mean(current, 'sales'), mean(previous, 'sales')), 1),
+            'customer_growth': round(safe_growth(current['new_customers'], previous['new_customers']), 1),
+            'comparison': self.comparison,
             'currency_symbol': self.currency_symbol
         }
 
+    def daily_sales_trend(self):
+        return rollup(self.converted_cube, 'date', {'sales': 'sum', 'returns': 'sum'})
+
+    @cached_result
     def get_sales_trend_data(self):
-        daily = self.filtered_df.groupby('date')[['sales', 'returns']].sum().reset_index()
-        daily['sales'] = daily['sales'].apply(self.convert_amount)
-        daily['returns'] = daily['returns'].apply(self.convert_amount)
-        return daily
+        """Sales and returns over time, shaped by the trend options.
+
+        With the default options the granularity follows the length of the
+        range, so long ranges come back as weekly or monthly totals.
+        """
+        return shape_trend(
+            self.daily_sales_trend(), self.trend_granularity, self.trend_downsample, self.trend_max_points
+        )
 
+    @cached_result
     def get_order_source_data(self):
-        order_source_data = self.filtered_df.groupby('order_source').agg({'sales': 'sum'}).reset_index()
-        order_source_data['sales'] = order_source_data['sales'].apply(self.convert_amount)
-        return order_source_data
+        return rollup(self.converted_cube, 'order_source', {'sales': 'sum'})
 
+    @cached_result
     def get_product_data(self):
-        product_data = self.filtered_df.groupby('product_id').agg({'sales': 'sum', 'category': 'first'}).reset_index()
-        product_data['sales'] = product_data['sales'].apply(self.convert_amount)
+        product_data = rollup(self.converted_cube, 'product_id', {'sales': 'sum', 'category': 'first'})
         return product_data.sort_values('sales', ascending=False).head(10)
 
-    def get_category_data(self):
-        cat = self.filtered_df.groupby('category').agg({
-            'sales': 'sum', 'inventory': 'mean', 'profit_margin': 'mean', 'profit': 'sum'
-        }).reset_index()
-        cat['sales'] = cat['sales'].apply(self.convert_amount)
-        cat['profit'] = cat['profit'].apply(self.convert_amount)
-        return cat
-
-    def get_inventory_data(self):
-        inv = self.filtered_df.groupby('category').agg({
-            'inventory': 'mean', 'sales': 'sum', 'profit_margin': 'mean'
-        }).reset_index()
-        inv['sales'] = inv['sales'].apply(self.convert_amount)
-        return inv
-
-    def get_customer_growth_data(self):
-        df = self.filtered_df.groupby('month').agg({
-            'new_customers': 'sum', 'sales': 'sum', 'avg_order_value': 'mean'
-        }).reset_index()
-        df['sales'] = df['sales'].apply(self.convert_amount)
-        df['avg_order_value'] = df['avg_order_value'].apply(self.convert_amount)
-        return df
-
-    def get_profitability_data(self):
-        df = self.filtered_df.groupby('category').agg({
-            'sales': 'sum', 'profit': 'sum', 'profit_margin': 'mean'
-        }).reset_index()
-        df['sales'] = df['sales'].apply(self.convert_amount)
-        df['profit'] = df['profit'].apply(self.convert_amount)
-        return df
-
-    def get_customer_insights_data(self):
-        df = self.filtered_df.groupby('month').agg({
-            'new_customers': 'sum', 'avg_order_value': 'mean'
-        }).reset_index()
-        df['avg_order_value'] = df['avg_order_value'].apply(self.convert_amount)
-        return df
+    def rollup_by_category(self):
+        return rollup(self.converted_cube, 'category', CATEGORY_AGGREGATIONS)
+
+    def rollup_by_month(self):
+        return rollup(self.converted_cube, 'month', MONTH_AGGREGATIONS)
+
+    def shared_rollup(self, by):
+        """``rollup_by_<by>()``, computed once for the current filters and currency.
+
+        The panels grouping by the same key take their columns from it, so
+        they can be requested separately without rolling up again.
+        """
+        if by not in self._rollups:
+            self._rollups[by] = getattr(self, f'rollup_by_{by}')()
+        return self._rollups[by]
+
+    @cached_result
+    def get_category_data(self, by_category=None):
+        by_category = self.shared_rollup('category') if by_category is None else by_category
+        return by_category[['category', 'sales', 'inventory', 'profit_margin', 'profit']]
+
+    @cached_result
+    def get_inventory_data(self, by_category=None):
+        by_category = self.shared_rollup('category') if by_category is None else by_category
+        return by_category[['category', 'inventory', 'sales', 'profit_margin']]
+
+    @cached_result
+    def get_customer_growth_data(self, by_month=None):
+        by_month = self.shared_rollup('month') if by_month is None else by_month
+        return by_month[['month', 'new_customers', 'sales', 'avg_order_value']]
+
+    @cached_result
+    def get_profitability_data(self, by_category=None):
+        by_category = self.shared_rollup('category') if by_category is None else by_category
+        return by_category[['category', 'sales', 'profit', 'profit_margin']]
+
+    @cached_result
+    def get_customer_insights_data(self, by_month=None):
+        by_month = self.shared_rollup('month') if by_month is None else by_month
+        return by_month[['month', 'new_customers', 'avg_order_value']]
+
+    @cached_result
+    def compute_dashboard(self):
+        """Every panel's data for the current filters and currency.
+
+        The cube is rolled up once per grouping key and the panels sharing a
+        key take their columns from that roll-up, so one call replaces the
+        separate ``get_*`` calls and gives a consistent set of results.
+        """
+        by_category = self.shared_rollup('category')
+        by_month = self.shared_rollup('month')
+        return {
+            'metrics': self.get_metrics_data(),
+            'sales_trend': self.get_sales_trend_data(),
+            'order_source': self.get_order_source_data(),
+            'products': self.get_product_data(),
+            'category': self.get_category_data(by_category),
+            'inventory': self.get_inventory_data(by_category),
+            'customer_growth': self.get_customer_growth_data(by_month),
+            'profitability': self.get_profitability_data(by_category),
+            'customer_insights': self.get_customer_insights_data(by_month),
+        }
+
+
+def create_processor(folder_name='Your_Company', backend=None):
+    """A dashboard processor on the query backend named by ``backend`` or DASHBOARD_BACKEND."""
+    backend = backend or QUERY_BACKEND
+    if backend == 'pandas':
+        return DashboardDataProcessor(folder_name)
+    if backend == 'sqlite':
+        from sql_backend import SQLiteDashboardDataProcessor
+        return SQLiteDashboardDataProcessor(folder_name)
+    raise ValueError(f"Unknown query backend: {backend}")
+
 
 # Example usage
 if __name__ == "__main__":
@@ -161,4 +1070,9 @@ if __name__ == "__main__":
     print("\nCustomer Growth:", processor.get_customer_growth_data().head())
     print("\nProfitability:", processor.get_profitability_data().head())
     print("\nCustomer Insights:", processor.get_customer_insights_data().head())
-    print(processor.df.shape)
+    print(processor.df.shape, "cube:", processor.dataset.cube.shape)
+    print("Cube mismatches:", cube_mismatches(processor.df, processor.dataset.cube))
+    print("Memory:", processor.dataset.memory_report())
+    print("Duplicates dropped:", processor.dataset.duplicates_dropped)
+    print("HTTP:", get_http_client().metrics())
+    print("Result cache:", result_cache.stats())
@@ -0,0 +1,382 @@
+import base64
+import hashlib
+import json
+import os
+import posixpath
+import tarfile
+import threading
+
+from http_client import get_http_client
+
+# 'github' serves client folders from the data repository, 'local' from a
+# directory on this machine (one sub-directory per client folder)
+STORAGE_BACKEND = os.getenv('DASHBOARD_STORAGE', 'github')
+LOCAL_DATA_DIR = os.getenv('DASHBOARD_DATA_DIR', os.path.join('data', 'raw'))
+
+GITHUB_API_URL = os.getenv('GITHUB_API_URL', 'https://api.github.com')
+DATA_REPO = 'AllOfTech-Org/client-dashboards-data'
+# Branch of the data repository; unset uses the repository's default branch
+DATA_BRANCH = os.getenv('DATA_BRANCH')
+
+# 'contents' lists a folder and downloads each file; 'bulk' lists it from
+# the recursive git tree and pulls missing uploads from one repository archive
+FETCH_MODE = os.getenv('DASHBOARD_FETCH_MODE', 'contents')
+
+# In bulk mode, fewer missing uploads than this are fetched one by one,
+# since the archive holds every client folder
+BULK_ARCHIVE_MIN_FILES = 4
+
+# Downloaded uploads, stored by git blob SHA so unchanged files never cross
+# the network twice
+CACHE_DIR = os.path.join('data', 'interim', 'github_cache')
+
+
+class StorageError(Exception):
+    pass
+
+
+class StorageConflict(StorageError):
+    """A write would replace an existing file; uploads are never overwritten."""
+
+
+def git_blob_sha(data):
+    """The SHA git gives a file with these bytes."""
+    return hashlib.sha1(b'blob %d\0' % len(data) + data).hexdigest()
+
+
+class StorageBackend:
+    """Where client uploads live.
+
+    Files are addressed by client folder and file name. ``list`` and ``stat``
+    return entries as dicts with at least ``name``, ``size`` and ``sha``, a
+    version identifier that changes whenever the file's content does; an
+    entry is what ``read`` takes.
+    """
+
+    def list(self, folder_name):
+        raise NotImplementedError
+
+    def stat(self, folder_name, file_name):
+        for entry in self.list(folder_name):
+            if entry['name'] == file_name:
+                return entry
+        return None
+
+    def read(self, entry):
+        """The text of an entry; raises StorageError if it cannot be read."""
+        raise NotImplementedError
+
+    def write(self, folder_name, file_name, content, message=None):
+        """Create a file; raises StorageConflict if it already exists.
+
+        Uploads are immutable, since cached blobs and incremental refreshes
+        assume a loaded file never changes.
+        """
+        raise NotImplementedError
+
+    def prefetch(self, entries):
+        """Hint that ``entries`` are about to be read."""
+
+
+class LocalStorage(StorageBackend):
+    """Client folders as sub-directories of a local directory."""
+
+    def __init__(self, root=LOCAL_DATA_DIR):
+        self.root = root
+
+    def _entry(self, folder_name, file_name):
+        path = os.path.join(self.root, folder_name, file_name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        if not os.path.isfile(path):
+            return None
+        # Modification time and size stand in for a content hash, so listing
+        # a folder never has to read the files
+        return {
+            'name': file_name,
+            'path': path,
+            'size': stat.st_size,
+            'sha': f'{stat.st_mtime_ns:x}-{stat.st_size:x}',
+        }
+
+    def list(self, folder_name):
+        folder = os.path.join(self.root, folder_name)
+        if not os.path.isdir(folder):
+            return []
+        entries = (self._entry(folder_name, name) for name in sorted(os.listdir(folder)))
+        return [entry for entry in entries if entry is not None]
+
+    def stat(self, folder_name, file_name):
+        return self._entry(folder_name, file_name)
+
+    def read(self, entry):
+        try:
+            with open(entry['path'], 'r', encoding='utf-8') as f:
+                return f.read()
+        except OSError as e:
+            raise StorageError(f"Failed to read {entry['name']}: {e}") from e
+
+    def write(self, folder_name, file_name, content, message=None):
+        folder = os.path.join(self.root, folder_name)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, file_name)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        try:
+            # Unlike a rename, linking fails when the name is already taken
+            os.link(tmp_path, path)
+        except FileExistsError:
+            raise StorageConflict(f"{folder_name}/{file_name} already exists") from None
+        finally:
+            os.remove(tmp_path)
+        return self._entry(folder_name, file_name)
+
+
+class GitHubFileCache:
+    """On-disk cache of folder listings (by ETag) and CSV blobs (by SHA)."""
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(os.path.join(cache_dir, 'blobs'), exist_ok=True)
+
+    def _write(self, path, content):
+        # Write to a temporary file first so readers never see half a file;
+        # its name is unique to the thread, as sessions fetch in parallel
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def blob_path(self, sha):
+        return os.path.join(self.cache_dir, 'blobs', f'{sha}.csv')
+
+    def has_blob(self, sha):
+        return bool(sha) and os.path.exists(self.blob_path(sha))
+
+    def read_blob(self, sha):
+        path = self.blob_path(sha)
+        if not sha or not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def write_blob(self, sha, content):
+        # A blob's content never changes, so one already cached is kept
+        if sha and not self.has_blob(sha):
+            self._write(self.blob_path(sha), content)
+
+    def listing_path(self, folder_name):
+        return os.path.join(self.cache_dir, f'listing-{folder_name}.json')
+
+    def read_listing(self, folder_name):
+        path = self.listing_path(folder_name)
+        if not os.path.exists(path):
+            return None, None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            return cached['etag'], cached['files']
+        except (ValueError, KeyError):
+            return None, None
+
+    def write_listing(self, folder_name, etag, files):
+        if etag:
+            self._write(self.listing_path(folder_name), json.dumps({'etag': etag, 'files': files}))
+
+
+class GitHubStorage(StorageBackend):
+    """Client folders under ``data/`` in the GitHub data repository.
+
+    Listings are revalidated with ETags and file contents are cached on disk
+    by blob SHA, so only new or changed uploads are downloaded.
+    """
+
+    def __init__(self, token=None, repo=DATA_REPO, branch=DATA_BRANCH,
+                 api_url=GITHUB_API_URL, fetch_mode=FETCH_MODE, cache=None, http=None):
+        if token is None:
+            # Only the deployed app reads the token, from Streamlit's secrets
+            import streamlit as st
+            token = st.secrets["DATA_TOKEN"]
+        self.token = token
+        self.repo = repo
+        self.branch = branch
+        self.api_url = api_url
+        self.fetch_mode = fetch_mode
+        self.cache = cache if cache is not None else GitHubFileCache()
+        self.http = http if http is not None else get_http_client()
+
+    @property
+    def headers(self):
+        return {
+            'Authorization': f'token {self.token}',
+            'Accept': 'application/vnd.github.v3+json'
+        }
+
+    @property
+    def ref(self):
+        # HEAD is the default branch wherever the API takes a ref in the path
+        return self.branch or 'HEAD'
+
+    def fetch_listing(self, url, cache_key, extract=None, missing=None):
+        """GET a listing, revalidating a cached copy with If-None-Match.
+
+        GitHub answers an unchanged resource with 304 Not Modified, which does
+        not count against the rate limit. ``extract`` picks the part of the
+        response body worth keeping. A 404 returns ``missing`` when it is
+        given and raises StorageError otherwise.
+        """
+        etag, cached_files = self.cache.read_listing(cache_key)
+
+        request_headers = self.headers
+        if etag and cached_files is not None:
+            request_headers['If-None-Match'] = etag
+
+        response = self.http.get(url, headers=request_headers)
+        if response.status_code == 304 and cached_files is not None:
+            return cached_files
+        if response.status_code == 404 and missing is not None:
+            return missing
+        if response.status_code != 200:
+            raise StorageError(f"Failed to fetch folder content: {response.status_code}")
+
+        file_list = extract(response.json()) if extract else response.json()
+        self.cache.write_listing(cache_key, response.headers.get('ETag'), file_list)
+        return file_list
+
+    def fetch_folder_listing(self, folder_name):
+        """List a client folder through the contents API.
+
+        A folder that does not exist yet lists as empty, as it does locally.
+        """
+        folder_url = f'{self.api_url}/repos/{self.repo}/contents/data/{folder_name}'
+        if self.branch:
+            folder_url += f'?ref={self.branch}'
+        return [
+            file for file in self.fetch_listing(folder_url, folder_name, missing=[])
+            if file.get('type', 'file') == 'file'
+        ]
+
+    def fetch_folder_tree(self, folder_name):
+        """List a client folder from the recursive git tree of the data branch.
+
+        Entries are shaped like contents API entries; their ``download_url``
+        points at the blob endpoint, which serves raw content.
+        """
+        tree_url = f'{self.api_url}/repos/{self.repo}/git/trees/{self.ref}?recursive=1'
+        prefix = f'data/{folder_name}/'
+
+        def extract(body):
+            if body.get('truncated'):
+                # Too large for one tree response; fall back to the folder listing
+                return None
+            return [
+                {
+                    'name': posixpath.basename(entry['path']),
+                    'path': entry['path'],
+                    'sha': entry['sha'],
+                    'size': entry.get('size'),
+                    'download_url': f"{self.api_url}/repos/{self.repo}/git/blobs/{entry['sha']}",
+                }
+                for entry in body.get('tree', [])
+                if entry.get('type') == 'blob' and posixpath.dirname(entry['path']) + '/' == prefix
+            ]
+
+        file_list = self.fetch_listing(tree_url, f'tree-{folder_name}', extract)
+        if file_list is None:
+            return self.fetch_folder_listing(folder_name)
+        return file_list
+
+    def fetch_folder_archive(self, files):
+        """Fill the blob cache for ``files`` from a single repository tarball.
+
+        The archive is streamed and only the requested paths are extracted.
+        Each file is stored under the SHA of its bytes, so a branch that moved
+        between listing and download cannot poison the cache. Returns the
+        number of files stored.
+        """
+        wanted = {file['path']: file['sha'] for file in files}
+        archive_url = f'{self.api_url}/repos/{self.repo}/tarball/{self.ref}'
+        stored = 0
+        with self.http.get(archive_url, headers=self.headers, stream=True) as response:
+            # Whatever the archive misses is downloaded file by file later
+            if response.status_code != 200:
+                return stored
+            with tarfile.open(fileobj=response.raw, mode='r|gz') as archive:
+                for member in archive:
+                    # Members live under a '<owner>-<repo>-<commit>/' directory
+                    path = member.name.split('/', 1)[-1]
+                    if not member.isfile() or path not in wanted:
+                        continue
+                    data = archive.extractfile(member).read()
+                    sha = git_blob_sha(data)
+                    if sha == wanted[path]:
+                        self.cache.write_blob(sha, data.decode('utf-8'))
+                        stored += 1
+        return stored
+
+    def list(self, folder_name):
+        if self.fetch_mode == 'bulk':
+            return self.fetch_folder_tree(folder_name)
+        return self.fetch_folder_listing(folder_name)
+
+    def prefetch(self, entries):
+        # One archive download beats many single downloads in bulk mode
+        if self.fetch_mode != 'bulk':
+            return
+        missing = [entry for entry in entries if not self.cache.has_blob(entry.get('sha'))]
+        if len(missing) >= BULK_ARCHIVE_MIN_FILES:
+            self.fetch_folder_archive(missing)
+
+    def read(self, entry):
+        content = self.cache.read_blob(entry.get('sha'))
+        if content is None:
+            # Raw content from the blob endpoint; download URLs ignore Accept
+            download_headers = dict(self.headers, Accept='application/vnd.github.raw+json')
+            csv_response = self.http.get(entry['download_url'], headers=download_headers)
+            if csv_response.status_code != 200:
+                raise StorageError(f"Failed to fetch {entry['name']}: {csv_response.status_code}")
+            content = csv_response.text
+            self.cache.write_blob(entry.get('sha'), content)
+        return content
+
+    def write(self, folder_name, file_name, content, message=None):
+        path = f'data/{folder_name}/{file_name}'
+        if self.stat(folder_name, file_name) is not None:
+            raise StorageConflict(f"{path} already exists")
+
+        # Without a 'sha' the contents API only creates files, so a file
+        # added since the check above is not replaced either
+        body = {
+            'message': message or f'Add {path}',
+            'content': base64.b64encode(content.encode('utf-8')).decode(),
+        }
+        # Written where fetch_folder_listing reads, the default branch unless
+        # one is set
+        if self.branch:
+            body['branch'] = self.branch
+        response = self.http.put(
+            f'{self.api_url}/repos/{self.repo}/contents/{path}',
+            headers=self.headers,
+            json=body
+        )
+        if response.status_code == 422 and '"sha"' in response.json().get('message', ''):
+            raise StorageConflict(f"{path} already exists")
+        if response.status_code not in (200, 201):
+            raise StorageError(f"Failed to write {path}: {response.status_code} {response.text}")
+        written = response.json()['content']
+        # The new blob is already known locally; no need to download it again
+        self.cache.write_blob(written['sha'], content)
+        return written
+
+
+def get_storage_backend(backend=None, **options):
+    """The storage backend named by ``backend`` or DASHBOARD_STORAGE."""
+    backend = backend or STORAGE_BACKEND
+    if backend == 'local':
+        return LocalStorage(**options)
+    if backend == 'github':
+        return GitHubStorage(**options)
+    raise ValueError(f"Unknown storage backend: {backend}")
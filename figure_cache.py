@@ -0,0 +1,76 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import streamlit as st
+
+# Figure specs kept across sessions, least recently used evicted first
+FIGURE_CACHE_SIZE = 512
+
+
+def frame_fingerprint(df):
+    """A hash of a panel frame's values, row order, columns, dtypes and attrs."""
+    digest = hashlib.sha1()
+    digest.update(json.dumps(
+        [[str(column) for column in df.columns], [str(dtype) for dtype in df.dtypes], df.attrs],
+        default=str
+    ).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class FigureCache:
+    """Bounded LRU cache of Plotly figure specs, shared by every session.
+
+    Specs are plain dicts as produced by ``Figure.to_dict()``, which
+    ``st.plotly_chart`` accepts as they are; they must not be modified.
+    """
+
+    def __init__(self, max_size=FIGURE_CACHE_SIZE):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._specs = OrderedDict()
+        self._stats = {'hits': 0, 'misses': 0}
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, size=len(self._specs))
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            if key in self._specs:
+                self._specs.move_to_end(key)
+                self._stats['hits'] += 1
+                return self._specs[key]
+            self._stats['misses'] += 1
+
+        spec = build().to_dict()
+        with self._lock:
+            self._specs[key] = spec
+            self._specs.move_to_end(key)
+            while len(self._specs) > self.max_size:
+                self._specs.popitem(last=False)
+        return spec
+
+
+figure_cache = FigureCache()
+
+
+def cached_figure(build, data, *options):
+    """The spec of the figure ``build()`` makes, reused while its inputs are unchanged.
+
+    ``build`` must depend only on ``data`` (a frame, or a tuple of frames)
+    and ``options``, such as the currency symbol and the plot defaults. The
+    key also holds where ``build`` is defined and the Streamlit theme.
+    """
+    frames = data if isinstance(data, (list, tuple)) else (data,)
+    key = (
+        build.__code__.co_filename,
+        build.__code__.co_firstlineno,
+        tuple(frame_fingerprint(frame) for frame in frames),
+        json.dumps(options, sort_keys=True, default=str),
+        st.get_option('theme.base'),
+    )
+    return figure_cache.get_or_build(key, build)
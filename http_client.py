@@ -0,0 +1,176 @@
+import logging
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Connections kept open per host; enough for every parallel download
+POOL_SIZE = 16
+
+# (connect, read) timeouts in seconds
+TIMEOUT = (5, 30)
+
+MAX_RETRIES = 4
+BACKOFF_SECONDS = 0.5
+MAX_BACKOFF_SECONDS = 30
+
+# Requests kept in reserve from GitHub's hourly budget. Below it, callers
+# wait for the budget to reset, at most MAX_RATE_LIMIT_WAIT seconds
+RATE_LIMIT_RESERVE = 50
+MAX_RATE_LIMIT_WAIT = 60
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RateLimitExceeded(Exception):
+    pass
+
+
+class HttpClient:
+    """Pooled HTTP session shared by every dashboard session in the process.
+
+    Connections are kept alive between requests, every request has a
+    timeout, transient failures are retried with exponential backoff, and
+    GitHub's ``X-RateLimit-*`` headers are tracked so requests slow down
+    before the budget runs out rather than failing once it has.
+    """
+
+    def __init__(self, pool_size=POOL_SIZE, timeout=TIMEOUT, max_retries=MAX_RETRIES,
+                 backoff=BACKOFF_SECONDS, max_backoff=MAX_BACKOFF_SECONDS,
+                 rate_limit_reserve=RATE_LIMIT_RESERVE, max_rate_limit_wait=MAX_RATE_LIMIT_WAIT):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.rate_limit_reserve = rate_limit_reserve
+        self.max_rate_limit_wait = max_rate_limit_wait
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._lock = threading.Lock()
+        self._metrics = {
+            'requests': 0,
+            'bytes': 0,
+            'retries': 0,
+            'errors': 0,
+            'not_modified': 0,
+            'throttled_seconds': 0.0,
+            'rate_limit_limit': None,
+            'rate_limit_remaining': None,
+            'rate_limit_reset': None,
+        }
+
+    def metrics(self):
+        with self._lock:
+            return dict(self._metrics)
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._metrics[name] += amount
+
+    def _record_rate_limit(self, response):
+        headers = response.headers
+        if 'X-RateLimit-Remaining' not in headers:
+            return
+        try:
+            with self._lock:
+                self._metrics['rate_limit_remaining'] = int(headers['X-RateLimit-Remaining'])
+                self._metrics['rate_limit_limit'] = int(headers.get('X-RateLimit-Limit', 0)) or None
+                self._metrics['rate_limit_reset'] = int(headers.get('X-RateLimit-Reset', 0)) or None
+        except ValueError:
+            pass
+
+    def _wait_for_budget(self):
+        with self._lock:
+            remaining = self._metrics['rate_limit_remaining']
+            reset = self._metrics['rate_limit_reset']
+        if remaining is None or reset is None or remaining > self.rate_limit_reserve:
+            return
+        wait = reset - time.time()
+        if wait <= 0:
+            return
+        if wait > self.max_rate_limit_wait:
+            raise RateLimitExceeded(
+                f"GitHub rate limit nearly exhausted ({remaining} left), resets in {wait:.0f}s"
+            )
+        logger.warning("Rate limit budget low (%s left); waiting %.1fs", remaining, wait)
+        time.sleep(wait)
+        self._count('throttled_seconds', wait)
+
+    def _retry_delay(self, attempt, response=None):
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                return min(int(retry_after), self.max_backoff)
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        # Jitter keeps concurrent sessions from retrying in lockstep
+        return delay * random.uniform(0.5, 1.0)
+
+    def _should_retry(self, response):
+        if response.status_code in RETRY_STATUSES:
+            return True
+        # GitHub reports an exhausted primary rate limit as 403
+        return response.status_code == 403 and response.headers.get('X-RateLimit-Remaining') == '0'
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        # Revalidations answered 304 Not Modified do not count against the
+        # rate limit, so they are sent however low the budget is
+        conditional = 'If-None-Match' in (kwargs.get('headers') or {})
+        attempt = 0
+        while True:
+            if not conditional:
+                self._wait_for_budget()
+            self._count('requests')
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.max_retries:
+                    self._count('errors')
+                    raise
+                delay = self._retry_delay(attempt)
+                logger.warning("%s %s failed (%s); retrying in %.1fs", method, url, e, delay)
+            else:
+                self._record_rate_limit(response)
+                if response.status_code == 304:
+                    self._count('not_modified')
+                if not self._should_retry(response) or attempt >= self.max_retries:
+                    if response.status_code >= 400:
+                        self._count('errors')
+                    if kwargs.get('stream'):
+                        self._count('bytes', int(response.headers.get('Content-Length', 0) or 0))
+                    else:
+                        self._count('bytes', len(response.content))
+                    return response
+                delay = self._retry_delay(attempt, response)
+                logger.warning("%s %s returned %s; retrying in %.1fs", method, url, response.status_code, delay)
+                response.close()
+            self._count('retries')
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """The process-wide HttpClient."""
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = HttpClient()
+        return _shared_client
@@ -0,0 +1,438 @@
+import glob
+import json
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+from data_cube import DailyPrefixSums
+from data_processor import (
+    CATEGORICAL_COLUMNS, DATE_FORMAT, DEDUP_KEY, DEDUP_VERSION, FILTER_COLUMNS, KPI_COLUMNS, MAX_FETCH_WORKERS,
+    SCHEMA_VERSION, SNAPSHOT_DIR, DashboardDataProcessor, DatasetRegistry, cached_result,
+    csv_listing, date_range_slice, fetch_csv_files, file_manifest, manifest_version, new_uploads,
+    row_hashes
+)
+from data_storage import get_storage_backend
+
+logger = logging.getLogger(__name__)
+
+# Rows written per INSERT batch while an upload is added
+INSERT_CHUNK_ROWS = 50000
+
+# The dashboard filters on every one of these columns
+INDEXED_COLUMNS = ['date', 'category', 'order_source', 'product_id']
+
+# Integer result columns; other measures are floats
+COUNT_DTYPES = {'new_customers': 'int64', 'sales_count': 'int64', 'rows': 'int64'}
+
+# Hash of each row's DEDUP_KEY columns (the whole row by default); an upload
+# replaces the stored rows that share a hash with any of its rows
+ROW_KEY = 'row_key'
+
+
+def quote(name):
+    """``name`` as an SQL identifier; upload column names may hold spaces or quotes."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+class SQLiteStore:
+    """A client dataset in an indexed SQLite file, extended as uploads arrive.
+
+    Rows stay on disk and every query is a SQL aggregation, so memory use
+    follows the size of query results rather than the length of the
+    history. Uploads are streamed in a few at a time and never pass through
+    a pandas frame of the whole history. Dates are stored as ISO text, which
+    sorts chronologically.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # One read-only connection per store, shared by every session. It
+        # keeps the file open, so a store replaced on disk stays readable.
+        self._connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+        meta = dict(self.execute('SELECT key, value FROM meta'))
+        self.folder_name = meta['folder_name']
+        self.version = meta['version']
+        self.schema = meta['schema']
+        self.dedup_key = json.loads(meta['dedup_key'])
+        self.dedup_version = json.loads(meta.get('dedup_version', 'null'))
+        self.manifest = json.loads(meta['files'])
+        self.columns = [row[1] for row in self.execute("PRAGMA table_info('rows')") if row[1] != ROW_KEY]
+
+        # Distinct values come from the indexes, without reading the rows
+        days = [day for day, in self.execute('SELECT DISTINCT date FROM rows WHERE date IS NOT NULL ORDER BY date')]
+        self.days = pd.to_datetime(pd.Series(days, dtype='object'), format=DATE_FORMAT).to_numpy()
+        self.values = {
+            column: [value for value, in self.execute(
+                'SELECT DISTINCT {0} FROM rows WHERE {0} IS NOT NULL ORDER BY {0}'.format(quote(column))
+            )]
+            for column in FILTER_COLUMNS if column in self.columns
+        }
+
+    def close(self):
+        self._connection.close()
+
+    def execute(self, sql, params=()):
+        with self._lock:
+            return self._connection.execute(sql, params).fetchall()
+
+    def query(self, sql, params=(), day_rates=None):
+        """Run ``sql`` into a frame.
+
+        ``day_rates`` maps days to exchange rates; when given, queries can
+        join them as the temporary table ``day_rates(date, rate)``.
+        """
+        with self._lock:
+            connection = self._connection
+            if day_rates is not None:
+                connection.execute('CREATE TEMP TABLE day_rates (date TEXT PRIMARY KEY, rate REAL)')
+                connection.executemany('INSERT INTO day_rates VALUES (?, ?)', day_rates)
+            try:
+                return pd.read_sql_query(sql, connection, params=params)
+            finally:
+                if day_rates is not None:
+                    connection.execute('DROP TABLE temp.day_rates')
+
+    @staticmethod
+    def _insert_upload(connection, frame):
+        """Insert one parsed upload, replacing stored rows with the same key.
+
+        Rows are added in upload order, so stored rows all come from earlier
+        uploads; rows sharing a key within the upload are all kept.
+        """
+        # Integers are hashed as floats, so a row's key does not depend on
+        # whether its upload could be downcast
+        hashed = frame.astype({
+            column: 'float64' for column, dtype in frame.dtypes.items() if pd.api.types.is_integer_dtype(dtype)
+        })
+        frame = frame.assign(**{ROW_KEY: row_hashes(hashed, DEDUP_KEY).view(np.int64)})
+        if 'date' in frame.columns:
+            frame['date'] = frame['date'].dt.strftime(DATE_FORMAT)
+        frame.to_sql('staging', connection, if_exists='replace', index=False, chunksize=INSERT_CHUNK_ROWS)
+
+        staging = connection.execute("PRAGMA table_info('staging')").fetchall()
+        # SQLite compares identifiers case-insensitively
+        existing = {row[1].lower() for row in connection.execute("PRAGMA table_info('rows')")}
+        if not existing:
+            connection.execute('CREATE TABLE rows AS SELECT * FROM staging WHERE 0')
+            connection.execute(f'CREATE INDEX idx_rows_{ROW_KEY} ON rows ({ROW_KEY})')
+        for _, column, column_type, *_ in staging:
+            if existing and column.lower() not in existing:
+                connection.execute(f'ALTER TABLE rows ADD COLUMN {quote(column)} {column_type}')
+
+        columns = ', '.join(quote(row[1]) for row in staging)
+        connection.execute(f'DELETE FROM rows WHERE {ROW_KEY} IN (SELECT {ROW_KEY} FROM staging)')
+        connection.execute(f'INSERT INTO rows ({columns}) SELECT {columns} FROM staging')
+        connection.execute('DROP TABLE staging')
+
+    @classmethod
+    def _add_uploads(cls, connection, files, storage, manifest):
+        """Stream ``files`` into the store; returns the extended manifest.
+
+        At most MAX_FETCH_WORKERS uploads are held in memory at a time. Each
+        upload is committed together with the manifest that records it, so
+        an interrupted build or append resumes where it stopped.
+        """
+        storage.prefetch(files)
+        for start in range(0, len(files), MAX_FETCH_WORKERS):
+            loaded_files, frames = fetch_csv_files(files[start:start + MAX_FETCH_WORKERS], storage)
+            for position, file in enumerate(loaded_files):
+                cls._insert_upload(connection, frames[position])
+                frames[position] = None
+                manifest = manifest + file_manifest([file])
+                connection.executemany('INSERT OR REPLACE INTO meta VALUES (?, ?)', [
+                    ('files', json.dumps(manifest)),
+                    ('version', manifest_version(manifest)),
+                ])
+                connection.commit()
+        return manifest
+
+    @staticmethod
+    def _create_indexes(connection):
+        columns = {row[1] for row in connection.execute("PRAGMA table_info('rows')")}
+        for column in INDEXED_COLUMNS:
+            if column in columns:
+                connection.execute(f'CREATE INDEX IF NOT EXISTS idx_rows_{column} ON rows ({quote(column)})')
+        connection.commit()
+
+    @classmethod
+    def build(cls, folder_name, csv_files, storage, path):
+        """Write the uploads ``csv_files`` of a folder to a new store at ``path``."""
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        with closing(sqlite3.connect(tmp_path)) as connection:
+            connection.execute('CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)')
+            connection.executemany('INSERT INTO meta VALUES (?, ?)', [
+                ('folder_name', folder_name),
+                ('schema', SCHEMA_VERSION),
+                ('dedup_key', json.dumps(DEDUP_KEY)),
+                ('dedup_version', json.dumps(DEDUP_VERSION)),
+            ])
+            cls._add_uploads(connection, csv_files, storage, [])
+            # Filter indexes are created once the rows are in, which is faster
+            # than updating them row by row
+            cls._create_indexes(connection)
+        os.replace(tmp_path, path)
+        return cls(path)
+
+    def append(self, files, storage):
+        """Add new uploads to this store's file; returns the store for the new version.
+
+        Only the new uploads are read, so the cost follows their size rather
+        than the history's. Sessions still holding this store read the added
+        rows as soon as they are committed.
+        """
+        with closing(sqlite3.connect(self.path)) as connection:
+            self._add_uploads(connection, files, storage, self.manifest)
+            self._create_indexes(connection)
+        return SQLiteStore(self.path)
+
+
+def store_path(folder_name, version, store_dir=SNAPSHOT_DIR):
+    return os.path.join(store_dir, f'{folder_name}-{version}.sqlite')
+
+
+def open_store(folder_name):
+    """The folder's existing store, if there is a usable one."""
+    paths = glob.glob(store_path(glob.escape(folder_name), '*'))
+    for path in sorted(paths, key=os.path.getmtime, reverse=True):
+        try:
+            store = SQLiteStore(path)
+        except (sqlite3.Error, KeyError, ValueError):
+            continue
+        if (store.schema == SCHEMA_VERSION and store.dedup_key == DEDUP_KEY
+                and store.dedup_version == DEDUP_VERSION):
+            return store
+        store.close()
+    return None
+
+
+class SQLiteStoreRegistry(DatasetRegistry):
+    """Process-wide SQLite stores of client folders, one file per client.
+
+    New uploads are appended to the folder's store; it is only built again,
+    upload by upload, when uploads it holds have changed or disappeared or
+    its layout is out of date.
+    """
+
+    # Serialises store builds within the process
+    _build_lock = threading.Lock()
+
+    def load(self, folder_name, current=None):
+        storage = get_storage_backend()
+        csv_files = csv_listing(storage.list(folder_name))
+        version = manifest_version(file_manifest(csv_files))
+        if current is not None and current.version == version:
+            return current
+
+        with self._build_lock:
+            store = open_store(folder_name)
+            if store is not None and store.version == version:
+                return store
+            new_files = new_uploads(store.manifest, csv_files) if store is not None else None
+            if new_files is not None:
+                store = store.append(new_files, storage)
+                logger.info("%s: added %d uploads to SQLite store %s", folder_name, len(new_files), store.path)
+                return store
+
+            if not csv_files:
+                raise Exception(f"No CSV files found in the {folder_name} folder.")
+            os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+            path = store_path(folder_name, version)
+            store = SQLiteStore.build(folder_name, csv_files, storage, path)
+            logger.info("%s: built SQLite store %s", folder_name, path)
+
+            # Stores still in use keep their open file after removal
+            for old_path in glob.glob(store_path(glob.escape(folder_name), '*')):
+                if old_path != path:
+                    try:
+                        os.remove(old_path)
+                    except OSError:
+                        pass
+        return store
+
+
+sqlite_store_registry = SQLiteStoreRegistry()
+
+
+class SQLiteDashboardDataProcessor(DashboardDataProcessor):
+    """DashboardDataProcessor answering every panel with SQL on a SQLite store.
+
+    Results match the pandas backend: amounts are converted at the rate of
+    each row's day before aggregating, and the KPI windows use the same
+    prefix sums over daily totals.
+    """
+
+    def _open(self, refresh=False):
+        registry = sqlite_store_registry
+        self.store = (registry.refresh if refresh else registry.get)(self.folder_name)
+
+    def dimension_values(self, column):
+        return list(self.store.values.get(column, []))
+
+    def date_bounds(self):
+        days = self.store.days
+        if not len(days):
+            return pd.NaT, pd.NaT
+        return pd.Timestamp(days[0]), pd.Timestamp(days[-1])
+
+    @property
+    def data_version(self):
+        return self.store.version
+
+    def _select_filtered(self):
+        # Date ranges are keyed by the days they select, like cube rows
+        days = self.store.days
+        date_range = self.date_range
+        if date_range:
+            start, end = pd.to_datetime(date_range[0]), pd.to_datetime(date_range[1])
+            self._days = days[date_range_slice(days, start, end)]
+        else:
+            self._days = days
+        if len(self._days):
+            day_key = (pd.Timestamp(self._days[0]).strftime(DATE_FORMAT),
+                       pd.Timestamp(self._days[-1]).strftime(DATE_FORMAT))
+        else:
+            day_key = None
+        self._filter_key = (day_key, tuple(sorted(self.dimension_filters.items())))
+
+    @property
+    def result_key(self):
+        return ('sqlite', self.folder_name, self.store.version) + self._filter_key + (self.currency,)
+
+    @property
+    def filtered_df(self):
+        columns = ', '.join(f'rows.{quote(column)}' for column in self.store.columns)
+        return self._query(f'SELECT {columns} FROM rows {{where}} ORDER BY rows.date')
+
+    def _query(self, sql, group_by=None):
+        """Run ``sql`` over the filtered rows.
+
+        ``{where}`` in ``sql`` becomes the filter clause and ``{rate}`` the
+        exchange rate of each row's day; rows with no ``group_by`` value
+        are left out, as pandas does.
+        """
+        clauses, params = [], []
+        if not len(self._days):
+            clauses.append('0')
+        elif len(self._days) < len(self.store.days):
+            clauses.append('rows.date BETWEEN ? AND ?')
+            params += list(self._filter_key[0])
+        for column, values in self.dimension_filters.items():
+            clauses.append(f"rows.{quote(column)} IN ({', '.join('?' * len(values))})")
+            params += list(values)
+        if group_by:
+            clauses.append(f'rows.{quote(group_by)} IS NOT NULL')
+        where = ('WHERE ' + ' AND '.join(clauses)) if clauses else ''
+
+        rates = self.exchange_rates.rates(self.currency, self._days)
+        if rates is None:
+            day_rates, rate = None, '1.0'
+        else:
+            days = pd.DatetimeIndex(self._days).strftime(DATE_FORMAT)
+            day_rates = list(zip(days, rates.tolist()))
+            where = 'JOIN day_rates ON day_rates.date = rows.date ' + where
+            rate = 'day_rates.rate'
+
+        result = self.store.query(sql.format(where=where, rate=rate), params, day_rates)
+        return self._typed(result)
+
+    def _typed(self, result):
+        # Same dtypes as the pandas backend's results, even when empty
+        for column in result.columns:
+            if column == 'date':
+                result[column] = pd.to_datetime(result[column], format=DATE_FORMAT).astype(self.store.days.dtype)
+            elif column in CATEGORICAL_COLUMNS:
+                categories = self.store.values.get(column)
+                if categories is None:
+                    categories = sorted(result[column].dropna().unique())
+                result[column] = pd.Categorical(result[column], categories=categories)
+            elif result[column].dtype == object:
+                result[column] = result[column].astype(COUNT_DTYPES.get(column, 'float64'))
+        return result
+
+    @property
+    def kpi_totals(self):
+        if self._kpi_totals is None:
+            daily = self._query('''
+                SELECT rows.date AS date,
+                       TOTAL(rows.sales * {rate}) AS sales,
+                       TOTAL(rows.returns * {rate}) AS returns,
+                       COALESCE(SUM(rows.new_customers), 0) AS new_customers,
+                       COUNT(rows.sales) AS sales_count,
+                       COUNT(*) AS rows,
+                       TOTAL(rows.sales) AS base_sales,
+                       TOTAL(rows.returns) AS base_returns
+                FROM rows {where}
+                GROUP BY rows.date ORDER BY rows.date
+            ''', group_by='date')
+            base = daily.drop(columns=['sales', 'returns']).rename(
+                columns={'base_sales': 'sales', 'base_returns': 'returns'}
+            )
+            self._kpi_totals = (DailyPrefixSums(daily, KPI_COLUMNS), DailyPrefixSums(base, KPI_COLUMNS))
+        return self._kpi_totals
+
+    def daily_sales_trend(self):
+        return self._query('''
+            SELECT rows.date AS date,
+                   TOTAL(rows.sales * {rate}) AS sales,
+                   TOTAL(rows.returns * {rate}) AS returns
+            FROM rows {where}
+            GROUP BY rows.date ORDER BY rows.date
+        ''', group_by='date')
+
+    @cached_result
+    def get_order_source_data(self):
+        return self._query('''
+            SELECT rows.order_source AS order_source, TOTAL(rows.sales * {rate}) AS sales
+            FROM rows {where}
+            GROUP BY rows.order_source ORDER BY rows.order_source
+        ''', group_by='order_source')
+
+    @cached_result
+    def get_product_data(self):
+        # A product's category is the lowest one on its first day, which is
+        # the first row of the product in the pandas backend's cube
+        return self._query('''
+            WITH filtered AS (
+                SELECT rows.product_id, rows.category, rows.date, rows.sales * {rate} AS sales
+                FROM rows {where}
+            ),
+            products AS (
+                SELECT product_id, TOTAL(sales) AS sales, MIN(date) AS first_date
+                FROM filtered GROUP BY product_id
+            )
+            SELECT p.product_id AS product_id, p.sales AS sales,
+                   (SELECT MIN(f.category) FROM filtered f
+                    WHERE f.product_id = p.product_id AND f.date = p.first_date) AS category
+            FROM products p
+            ORDER BY p.sales DESC
+            LIMIT 10
+        ''', group_by='product_id')
+
+    def rollup_by_category(self):
+        return self._query('''
+            SELECT rows.category AS category,
+                   TOTAL(rows.sales * {rate}) AS sales,
+                   AVG(rows.inventory) AS inventory,
+                   AVG(rows.profit_margin) AS profit_margin,
+                   TOTAL(rows.profit * {rate}) AS profit
+            FROM rows {where}
+            GROUP BY rows.category ORDER BY rows.category
+        ''', group_by='category')
+
+    def rollup_by_month(self):
+        return self._query('''
+            SELECT rows.month AS month,
+                   COALESCE(SUM(rows.new_customers), 0) AS new_customers,
+                   TOTAL(rows.sales * {rate}) AS sales,
+                   AVG(rows.avg_order_value * {rate}) AS avg_order_value
+            FROM rows {where}
+            GROUP BY rows.month ORDER BY rows.month
+        ''', group_by='month')
@@ -0,0 +1,103 @@
+import glob
+import hashlib
+import io
+import os
+import threading
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Streamlit serves files in ./static next to the app script under
+# app/static/ when server.enableStaticServing is on (.streamlit/config.toml)
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+STATIC_URL = 'app/static'
+
+# How each kind of image is prepared: the largest size it is shown at (on
+# high-density screens) and the encoding it is served in
+ASSET_SPECS = {
+    'background': {'max_size': (1920, 1080), 'format': 'WEBP', 'quality': 80},
+    'sidebar': {'max_size': (640, 1440), 'format': 'WEBP', 'quality': 75},
+    'logo': {'max_size': (480, 480), 'format': 'WEBP', 'quality': 90},
+    'icon': {'max_size': (64, 64), 'format': 'PNG', 'quality': None},
+}
+
+EXTENSIONS = {'WEBP': '.webp', 'PNG': '.png', 'JPEG': '.jpg'}
+
+_built = {}
+_built_lock = threading.Lock()
+
+
+def optimise_image(data, spec):
+    """Resize and re-encode image bytes per ``spec``; None if Pillow cannot."""
+    if Image is None:
+        return None
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+    except (OSError, ValueError):
+        return None
+    image.thumbnail(spec['max_size'], Image.LANCZOS)
+    if spec['format'] == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    elif image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+        image = image.convert('RGBA')
+
+    output = io.BytesIO()
+    options = {'optimize': True}
+    if spec['quality'] is not None:
+        options['quality'] = spec['quality']
+    image.save(output, format=spec['format'], **options)
+    return output.getvalue(), EXTENSIONS[spec['format']]
+
+
+def build_asset(source_path, kind, static_dir=STATIC_DIR):
+    """Write the prepared copy of ``source_path`` to ``static_dir``; returns its file name.
+
+    The name carries a hash of the content, so a changed image gets a new
+    URL and browsers may cache every version indefinitely.
+    """
+    with open(source_path, 'rb') as f:
+        original = f.read()
+    stem, extension = os.path.splitext(os.path.basename(source_path))
+
+    data = original
+    optimised = optimise_image(original, ASSET_SPECS[kind])
+    # Already small images may not shrink any further
+    if optimised is not None and len(optimised[0]) < len(original):
+        data, extension = optimised
+
+    prefix = f'{stem}-{kind}.'
+    file_name = f'{prefix}{hashlib.sha1(data).hexdigest()[:12]}{extension.lower()}'
+    path = os.path.join(static_dir, file_name)
+    if not os.path.exists(path):
+        os.makedirs(static_dir, exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    # Earlier versions of the same asset are no longer referenced
+    for old_path in glob.glob(os.path.join(static_dir, glob.escape(prefix) + '*')):
+        if os.path.basename(old_path) != file_name and not old_path.endswith('.tmp'):
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+    return file_name
+
+
+def static_asset_path(source_path, kind):
+    """Path of the prepared copy of ``source_path``, built once per version of the file."""
+    stat = os.stat(source_path)
+    key = (os.path.abspath(source_path), stat.st_mtime_ns, stat.st_size, kind)
+    with _built_lock:
+        if key not in _built or not os.path.exists(os.path.join(STATIC_DIR, _built[key])):
+            _built[key] = build_asset(source_path, kind)
+        return os.path.join(STATIC_DIR, _built[key])
+
+
+def static_asset_url(source_path, kind):
+    """URL the browser loads the prepared copy of ``source_path`` from."""
+    return f'{STATIC_URL}/{os.path.basename(static_asset_path(source_path, kind))}'
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+# Automatic trend granularity by the length of the selected range: one
+# point per day up to TREND_DAILY_MAX_DAYS days, per week up to
+# TREND_WEEKLY_MAX_DAYS, and per month beyond that
+TREND_DAILY_MAX_DAYS = 120
+TREND_WEEKLY_MAX_DAYS = 730
+TREND_GRANULARITIES = ['auto', 'day', 'week', 'month']
+
+# Points kept when a trend is downsampled
+TREND_MAX_POINTS = 400
+
+# Pandas period codes; weeks start on Monday
+PERIODS = {'week': 'W-SUN', 'month': 'M'}
+
+
+def auto_granularity(dates):
+    """'day', 'week' or 'month', by the span of sorted ``dates``."""
+    if len(dates) < 2:
+        return 'day'
+    days = (pd.Timestamp(dates[-1]) - pd.Timestamp(dates[0])).days
+    if days <= TREND_DAILY_MAX_DAYS:
+        return 'day'
+    if days <= TREND_WEEKLY_MAX_DAYS:
+        return 'week'
+    return 'month'
+
+
+def resample_trend(daily, granularity):
+    """Sum a daily trend into weeks or months, dated by the period start."""
+    if granularity == 'day':
+        return daily
+    periods = daily['date'].dt.to_period(PERIODS[granularity]).dt.start_time
+    values = [column for column in daily.columns if column != 'date']
+    resampled = daily[values].groupby(periods.rename('date'), sort=True).sum().reset_index()
+    resampled['date'] = resampled['date'].astype(daily['date'].dtype)
+    return resampled
+
+
+def lttb_indices(x, y, max_points):
+    """Positions of the points Largest-Triangle-Three-Buckets keeps.
+
+    The first and last points are always kept; in between, each bucket
+    keeps the point forming the largest triangle with the point kept
+    before it and the average of the next bucket, which preserves peaks
+    and dips that plain striding would drop.
+    """
+    n = len(x)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64))
+
+    # max_points - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    kept = np.empty(max_points, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x, next_y = x[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        kept[bucket + 1] = previous
+    return kept
+
+
+def shape_trend(daily, granularity='auto', downsample=None, max_points=TREND_MAX_POINTS, value_column='sales'):
+    """A daily trend at the requested granularity, optionally downsampled.
+
+    With ``downsample='lttb'`` a trend still longer than ``max_points`` is
+    reduced with LTTB on ``value_column``; the other columns keep the values
+    of the same dates. The granularity used is recorded in
+    ``attrs['granularity']``.
+    """
+    if granularity == 'auto':
+        granularity = auto_granularity(daily['date'].to_numpy())
+    if granularity not in PERIODS and granularity != 'day':
+        raise ValueError(f"Unknown trend granularity: {granularity}")
+    trend = resample_trend(daily, granularity)
+
+    if downsample == 'lttb' and len(trend) > max_points:
+        dates = trend['date'].to_numpy().astype('datetime64[ns]').astype(np.int64)
+        trend = trend.iloc[lttb_indices(dates, trend[value_column].to_numpy(), max_points)]
+        trend = trend.reset_index(drop=True)
+    elif downsample not in (None, 'lttb'):
+        raise ValueError(f"Unknown downsampling mode: {downsample}")
+
+    trend.attrs['granularity'] = granularity
+    return trend